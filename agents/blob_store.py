@@ -0,0 +1,78 @@
+import hashlib
+import logging
+import os
+import shutil
+import uuid
+
+from agents.hashing import file_hash, remember_hash
+
+logger = logging.getLogger(__name__)
+
+# Content-addressed copies of uploads live in <upload folder>/.objects/<hash[:2]>/<hash>
+OBJECTS_DIR = ".objects"
+
+
+def _blob_path(upload_folder: str, digest: str) -> str:
+    return os.path.join(upload_folder, OBJECTS_DIR, digest[:2], digest)
+
+
+def store_upload(stream, upload_folder: str, filename: str):
+    """
+    Stream an upload to disk while hashing it, store it once per content and
+    hard-link it under its filename. Returns (content_hash, size, duplicate),
+    where duplicate means filename already pointed at exactly this content and
+    nothing was written. A blob is only kept while a filename links to it.
+    """
+    objects = os.path.join(upload_folder, OBJECTS_DIR)
+    os.makedirs(objects, exist_ok=True)
+
+    tmp_path = os.path.join(objects, f"tmp-{uuid.uuid4().hex}")
+    h = hashlib.sha256()
+    size = 0
+    with open(tmp_path, "wb") as f:
+        for block in iter(lambda: stream.read(1024 * 1024), b""):
+            h.update(block)
+            f.write(block)
+            size += len(block)
+    digest = h.hexdigest()
+
+    blob = _blob_path(upload_folder, digest)
+    target = os.path.join(upload_folder, filename)
+    if os.path.exists(target) and (
+        (os.path.exists(blob) and os.path.samefile(target, blob)) or file_hash(target) == digest
+    ):
+        # Also covers files saved before the blob store, which have no blob of their own
+        os.remove(tmp_path)
+        return digest, size, True
+
+    created = not os.path.exists(blob)
+    if created:
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        os.replace(tmp_path, blob)
+    else:
+        os.remove(tmp_path)
+
+    # Link under a hidden name first so the swap is atomic
+    link_path = os.path.join(upload_folder, f".{filename}.tmp-{uuid.uuid4().hex[:8]}")
+    try:
+        os.link(blob, link_path)
+    except OSError:
+        # No hard links on this filesystem: a blob nothing links to would never be
+        # released, so a new upload becomes the file itself and others are copied
+        if created:
+            os.replace(blob, link_path)
+        else:
+            shutil.copyfile(blob, link_path)
+    os.replace(link_path, target)
+    remember_hash(target, digest)
+    return digest, size, False
+
+
+def release_blob(upload_folder: str, digest: str):
+    """Drop a stored blob once no filename links to it any more."""
+    blob = _blob_path(upload_folder, digest)
+    try:
+        if os.stat(blob).st_nlink <= 1:
+            os.remove(blob)
+    except OSError:
+        pass
@@ -0,0 +1,108 @@
+from contextlib import contextmanager
+import logging
+import os
+import sqlite3
+import time
+
+from agents.hashing import file_hash
+
+logger = logging.getLogger(__name__)
+
+
+class UploadCatalog:
+    """
+    SQLite index of the uploads folder: filename, format, size, content hash,
+    upload time and extraction status. Maintained on upload so listing never has
+    to stat the folder; rebuild() walks it once with os.scandir for cold starts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS uploads ("
+                " filename TEXT PRIMARY KEY, format TEXT NOT NULL, size INTEGER NOT NULL,"
+                " content_hash TEXT NOT NULL, uploaded_at REAL NOT NULL,"
+                " extraction_status TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS uploads_format ON uploads (format, filename)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, filename: str, size: int, content_hash: str, uploaded_at: float = None,
+               status: str = "pending"):
+        fmt = os.path.splitext(filename)[1].lower().lstrip(".")
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?)",
+                (filename, fmt, size, content_hash, uploaded_at or time.time(), status),
+            )
+
+    def set_status(self, filename: str, status: str):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE uploads SET extraction_status = ? WHERE filename = ? AND extraction_status != ?",
+                (status, filename, status),
+            )
+
+    def get(self, filename: str):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM uploads WHERE filename = ?", (filename,)).fetchone()
+        return dict(row) if row else None
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM uploads").fetchone()[0]
+
+    def list(self, cursor: str = None, limit: int = 100, fmt: str = None, exclude_formats=()):
+        """One page of entries ordered by filename, plus the cursor of the next page (None at the end)."""
+        query = "SELECT * FROM uploads WHERE filename > ?"
+        params = [cursor or ""]
+        if fmt:
+            query += " AND format = ?"
+            params.append(fmt)
+        if exclude_formats:
+            query += f" AND format NOT IN ({', '.join('?' * len(exclude_formats))})"
+            params.extend(exclude_formats)
+        query += " ORDER BY filename LIMIT ?"
+        # One extra row tells us whether there is a next page
+        params.append(limit + 1)
+
+        with self._connect() as conn:
+            rows = [dict(row) for row in conn.execute(query, params)]
+        next_cursor = rows[limit - 1]["filename"] if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    def rebuild(self, folder: str):
+        """Re-index every file in folder (hidden entries skipped)."""
+        started = time.perf_counter()
+        count = 0
+        with self._connect() as conn:
+            conn.execute("DELETE FROM uploads")
+            for entry in os.scandir(folder):
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                st = entry.stat()
+                conn.execute(
+                    "INSERT INTO uploads VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        entry.name,
+                        os.path.splitext(entry.name)[1].lower().lstrip("."),
+                        st.st_size,
+                        file_hash(entry.path),
+                        st.st_mtime,
+                        "pending",
+                    ),
+                )
+                count += 1
+        logger.info(f"Upload catalog rebuilt: {count} files in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,58 @@
+import os
+
+from langchain_core.embeddings import Embeddings
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from openai import OpenAI
+
+from agents.embedding_cache import CachedEmbeddings
+from agents.http_pool import get_or_create, stats
+from agents.llm_executor import embedding_executor
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+
+def get_chat_model(model: str, temperature: float, purpose: str = "default") -> ChatOpenAI:
+    """Shared chat model for (model, temperature, purpose)."""
+    return get_or_create(
+        ("chat", model, temperature, purpose),
+        # Retries are the LLM executor's job, the SDK should not retry underneath it
+        lambda http_client: ChatOpenAI(model=model, temperature=temperature, http_client=http_client, max_retries=0),
+    )
+
+
+class ExecutorEmbeddings(Embeddings):
+    """Sends every embeddings request (documents and queries) through the embedding executor."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.dimensions = getattr(inner, "dimensions", None)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return embedding_executor.execute(
+            lambda: self.inner.embed_documents(texts), sum(len(text) for text in texts) // 4
+        )
+
+    def embed_query(self, text: str) -> list[float]:
+        return embedding_executor.execute(lambda: self.inner.embed_query(text), len(text) // 4)
+
+
+def get_embeddings(model: str) -> CachedEmbeddings:
+    """
+    Shared embeddings for model: answered from the persistent embedding cache
+    when it is configured, misses go through the embedding executor.
+    """
+    return get_or_create(
+        ("embeddings", model),
+        # Retries are the executor's job, the SDK should not retry underneath it
+        lambda http_client: CachedEmbeddings(ExecutorEmbeddings(
+            OpenAIEmbeddings(model=model, api_key=OPENAI_API_KEY, http_client=http_client, max_retries=0)
+        ), model),
+    )
+
+
+def get_openai_client() -> OpenAI:
+    """Raw OpenAI SDK client on the shared pool, for calls that bypass LangChain."""
+    return get_or_create(
+        ("openai",),
+        lambda http_client: OpenAI(api_key=OPENAI_API_KEY, http_client=http_client, max_retries=0),
+    )
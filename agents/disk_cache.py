@@ -0,0 +1,113 @@
+import logging
+import os
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class DiskCache:
+    """
+    Key -> bytes store on disk, one file per entry under <root>/<key[:2]>/<key><suffix>.
+
+    Writes are atomic (temp file + rename), so several workers can share a root.
+    Reads touch the file mtime, which makes eviction least-recently-used once the
+    total size goes over max_bytes.
+    """
+
+    def __init__(self, root: str, max_bytes: int, suffix: str = ""):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(root, exist_ok=True)
+        self.bytes = sum(size for _, _, size in self._entries())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + self.suffix)
+
+    def _entries(self):
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_file() and entry.name.endswith(self.suffix) and ".tmp-" not in entry.name:
+                    st = entry.stat()
+                    yield st.st_mtime, entry.path, st.st_size
+
+    def path(self, key: str):
+        """Path of a cached entry, or None. Counts as a read for LRU purposes."""
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def get(self, key: str):
+        path = self.path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            # Evicted by another worker between the touch and the read
+            return None
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.bytes += len(data) - previous
+            over = self.bytes > self.max_bytes
+        if over:
+            self.evict()
+        return path
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, _, size in entries)
+            for _, path, size in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.evictions += 1
+            self.bytes = total
+
+    def record_lookups(self, hits: int, misses: int):
+        """Count lookups made by another process on the same root."""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
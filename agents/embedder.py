@@ -0,0 +1,92 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.hashing import text_hash
+
+logger = logging.getLogger(__name__)
+
+# Texts per embeddings request and requests in flight at once
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+
+_pool = ThreadPoolExecutor(max_workers=EMBED_CONCURRENCY, thread_name_prefix="embed")
+
+
+class EmbeddingStats:
+    """Texts asked for vs. texts actually sent to the provider, and time spent."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requested = 0
+        self.reused = 0
+        self.embedded = 0
+        self.requests = 0
+        self.seconds = 0.0
+
+    def record(self, requested: int, reused: int, embedded: int, requests: int, seconds: float):
+        with self._lock:
+            self.requested += requested
+            self.reused += reused
+            self.embedded += embedded
+            self.requests += requests
+            self.seconds += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "texts_requested": self.requested,
+                "texts_reused": self.reused,
+                "texts_embedded": self.embedded,
+                "dedup_ratio": round(1 - self.embedded / self.requested, 3) if self.requested else None,
+                "requests": self.requests,
+                "seconds_total": round(self.seconds, 3),
+            }
+
+
+embedding_stats = EmbeddingStats()
+
+
+def _embed_batch(embeddings, batch: list[str]) -> list:
+    # Rate limits, retries and the breaker apply per provider request, inside embeddings
+    # (see clients.get_embeddings), so texts served from the embedding cache cost nothing
+    return embeddings.embed_documents(batch)
+
+
+def embed_texts(embeddings, texts: list[str], lookup=None) -> list:
+    """
+    Vectors for texts, in the same order. Each distinct text is embedded once;
+    lookup(text hash) may return a vector computed earlier, e.g. for a chunk
+    repeated across pages. Unique texts are sent in batches of EMBED_BATCH_SIZE,
+    up to EMBED_CONCURRENCY requests at a time, under the embedding executor's
+    rate limit.
+    """
+    started = time.perf_counter()
+    hashes = [text_hash(text) for text in texts]
+    vectors = {}
+    pending = {}  # hash -> text, first occurrence order
+    for digest, text in zip(hashes, texts):
+        if digest in vectors or digest in pending:
+            continue
+        known = lookup(digest) if lookup else None
+        if known is not None:
+            vectors[digest] = known
+        else:
+            pending[digest] = text
+
+    unique = list(pending)
+    batches = [unique[i:i + EMBED_BATCH_SIZE] for i in range(0, len(unique), EMBED_BATCH_SIZE)]
+    if len(batches) == 1:
+        results = [_embed_batch(embeddings, [pending[digest] for digest in batches[0]])]
+    else:
+        futures = [_pool.submit(_embed_batch, embeddings, [pending[digest] for digest in batch]) for batch in batches]
+        results = [future.result() for future in futures]
+    for batch, batch_vectors in zip(batches, results):
+        vectors.update(zip(batch, batch_vectors))
+
+    seconds = time.perf_counter() - started
+    embedding_stats.record(len(texts), len(vectors) - len(unique), len(unique), len(batches), seconds)
+    logger.info(f"Embeddings: {len(texts)} requested, {len(unique)} unique sent in {len(batches)} requests, {seconds:.2f}s")
+    return [vectors[digest] for digest in hashes]
@@ -0,0 +1,128 @@
+import logging
+import os
+import unicodedata
+
+from agents import ocr
+from agents.disk_cache import DiskCache
+from agents.hashing import file_hash, text_hash
+
+logger = logging.getLogger(__name__)
+
+# Bump when an extractor or the normalization changes, old entries are then ignored
+EXTRACTOR_VERSION = "2"
+
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# PDF pages with less text layer than this are treated as scans and OCR'd
+PDF_OCR_MIN_CHARS = int(os.getenv("PDF_OCR_MIN_CHARS", "20"))
+
+# Disabled until the app tells us where to keep extracted text
+extraction_cache = None
+
+
+def configure_extraction_cache(root: str):
+    global extraction_cache
+    extraction_cache = DiskCache(root, EXTRACTION_CACHE_MAX_BYTES, suffix=".txt")
+    return extraction_cache
+
+
+def normalize_text(text: str) -> str:
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\x00", "")
+    return unicodedata.normalize("NFC", text)
+
+
+def _read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _read_docx(path: str) -> str:
+    try:
+        from docx import Document as DocxDocument
+    except ImportError:
+        raise ValueError("python-docx not installed")
+    doc = DocxDocument(path)
+    return "\n".join([para.text for para in doc.paragraphs])
+
+
+def _ocr_pdf_page(page, name: str) -> str:
+    if ocr.pytesseract is None:
+        return ""
+    texts = []
+    try:
+        for image in page.images:
+            texts.append(ocr.ocr_image_data(image.data, name))
+    except Exception as e:
+        logger.warning(f"OCR of {name} failed: {e}")
+    return "\n".join(texts)
+
+
+def iter_pdf_pages(path: str):
+    """
+    Yield (page number, text) one page at a time. The text layer is used when
+    there is one; pages without it (scans) fall back to OCR of their images.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        try:
+            from PyPDF2 import PdfReader
+        except ImportError:
+            raise ValueError("pypdf not installed")
+    reader = PdfReader(path)
+    name = os.path.basename(path)
+    for number, page in enumerate(reader.pages, start=1):
+        text = page.extract_text() or ""
+        if len(text.strip()) < PDF_OCR_MIN_CHARS:
+            text = _ocr_pdf_page(page, f"{name} p.{number}") or text
+        yield number, normalize_text(text)
+
+
+def _read_pdf(path: str) -> str:
+    return "\n".join(text for _, text in iter_pdf_pages(path))
+
+
+def _read_ipynb(path: str) -> str:
+    import nbformat
+    nb = nbformat.read(path, as_version=4)
+    cells = []
+    for cell in nb.cells:
+        if cell.cell_type in ("markdown", "code"):
+            cells.append(cell.source)
+    return "\n".join(cells)
+
+
+EXTRACTORS = {
+    ".txt": _read_text,
+    ".csv": _read_text,
+    ".md": _read_text,
+    ".docx": _read_docx,
+    ".pdf": _read_pdf,
+    ".ipynb": _read_ipynb,
+}
+
+
+def extract_text(path: str) -> str:
+    """
+    Normalized plain text of a document. Parsed once per file content: results
+    are stored on disk keyed by the content hash (the hash itself is memoized on
+    path, mtime and size), so notes views, analysis and indexing share one parse.
+    Raises ValueError for formats that cannot be read as text.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    key = text_hash(EXTRACTOR_VERSION, ext, file_hash(path))
+
+    if extraction_cache is not None:
+        cached = extraction_cache.get(key)
+        if cached is not None:
+            return cached.decode("utf-8")
+
+    extractor = EXTRACTORS.get(ext, _read_text)
+    try:
+        text = normalize_text(extractor(path))
+    except UnicodeDecodeError:
+        raise ValueError(f"Unsupported file format: {ext}")
+
+    if extraction_cache is not None:
+        extraction_cache.put(key, text.encode("utf-8"))
+    return text
@@ -0,0 +1,33 @@
+import hashlib
+import os
+
+# (path, mtime, size) -> sha256, so unchanged files are hashed once per process
+_hash_memo = {}
+
+
+def file_hash(path: str) -> str:
+    """sha256 of the file contents."""
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    digest = _hash_memo.get(memo_key)
+    if digest is not None:
+        return digest
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    _hash_memo[memo_key] = digest
+    return digest
+
+
+def text_hash(*parts: str) -> str:
+    """sha256 over '|'-joined parts, used to build cache keys."""
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def remember_hash(path: str, digest: str):
+    """Seed the memo when the hash was computed while writing the file."""
+    st = os.stat(path)
+    _hash_memo[(os.path.abspath(path), st.st_mtime_ns, st.st_size)] = digest
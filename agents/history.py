@@ -0,0 +1,136 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.clients import get_chat_model
+from agents.llm_executor import llm_executor
+
+logger = logging.getLogger(__name__)
+
+# Most recent messages always kept verbatim in the prompt
+HISTORY_KEEP_MESSAGES = int(os.getenv("HISTORY_KEEP_MESSAGES", "6"))
+# Upper bound for the history part of the Socratic prompt (summary + recent messages)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+
+_summarizer_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="history")
+
+# Loaded on first use: tiktoken may download the BPE file, which must not block or break import
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("o200k_base")
+                except Exception as e:
+                    # No tokenizer (or no network to fetch it), ~4 characters per token is close enough
+                    logger.warning(f"tiktoken unavailable, estimating tokens from length: {e}")
+                _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+def format_messages(messages: list[dict]) -> str:
+    return "\n".join([f"{msg['role']}: {msg['content']}" for msg in messages])
+
+
+def summarize(previous_summary: str, messages: list[dict]) -> str:
+    prompt = f"""
+    Update the running summary of a tutoring conversation with the new messages below.
+    Keep which questions were asked, what the student got right or wrong, and open gaps.
+    At most 150 words. Return ONLY the summary.
+
+    Current summary:
+    {previous_summary or "(none)"}
+
+    New messages:
+    {format_messages(messages)}
+    """
+    response = llm_executor.invoke(get_chat_model("gpt-4.1", 0.0, "history"), prompt)
+    return response.content.strip()
+
+
+class RollingHistory:
+    """
+    Prompt view of a conversation: the last keep_messages messages verbatim,
+    everything older folded into a running summary. The summary is refreshed
+    in the background after a turn, so it never delays the next question; until
+    it lands, not-yet-summarized messages stay verbatim and the token budget is
+    enforced by dropping the oldest of them.
+    """
+
+    def __init__(self, keep_messages: int = HISTORY_KEEP_MESSAGES, token_budget: int = HISTORY_TOKEN_BUDGET,
+                 summarizer=summarize):
+        self.keep_messages = keep_messages
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.summary = ""
+        self.summarized_upto = 0  # history[:summarized_upto] is covered by the summary
+        self._pending = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def render(self, history: list[dict]) -> str:
+        with self._lock:
+            summary, start = self.summary, min(self.summarized_upto, len(history))
+
+        lines = [f"{msg['role']}: {msg['content']}" for msg in history[start:]]
+        header = f"Summary of earlier conversation: {summary}" if summary else ""
+        budget = self.token_budget - (count_tokens(header) if header else 0)
+
+        # Newest first until the budget runs out, but the last message always goes in
+        kept = []
+        used = 0
+        for line in reversed(lines):
+            cost = count_tokens(line) + 1
+            if kept and used + cost > budget:
+                break
+            kept.append(line)
+            used += cost
+        kept.reverse()
+
+        if len(kept) < len(lines) and not header:
+            header = "(earlier messages omitted)"
+        return "\n".join(([header] if header else []) + kept)
+
+    def compact(self, history: list[dict]):
+        """Schedule a summary refresh if messages have fallen out of the verbatim window."""
+        with self._lock:
+            upto = len(history) - self.keep_messages
+            if upto <= self.summarized_upto or (self._pending and not self._pending.done()):
+                return
+            previous, messages = self.summary, list(history[self.summarized_upto:upto])
+            self._pending = _summarizer_pool.submit(self._summarize, previous, messages, upto, self._generation)
+
+    def _summarize(self, previous: str, messages: list[dict], upto: int, generation: int):
+        try:
+            summary = self.summarizer(previous, messages)
+        except Exception as e:
+            logger.warning(f"History summarization failed, keeping messages verbatim: {e}")
+            return
+        with self._lock:
+            # A reset (new topic) or rehydration may have happened in the meantime
+            if generation == self._generation and self.summarized_upto < upto:
+                self.summary = summary
+                self.summarized_upto = upto
+
+    def reset(self, summary: str = "", summarized_upto: int = 0):
+        """Start over, or restore a summary persisted with the session state."""
+        with self._lock:
+            self.summary = summary
+            self.summarized_upto = summarized_upto
+            self._pending = None
+            self._generation += 1
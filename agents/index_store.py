@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import pickle
+import shutil
+import time
+import uuid
+
+import faiss
+from langchain_community.vectorstores import FAISS
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.pkl"
+MANIFEST_FILE = "manifest.json"
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for entry in os.scandir(path):
+        if entry.is_file():
+            total += entry.stat().st_size
+    return total
+
+
+class IndexStore:
+    """
+    On-disk FAISS indexes, one directory per index key:
+
+        <root>/<key>/index.faiss    serialized FAISS index
+        <root>/<key>/docstore.pkl   docstore + index -> docstore id mapping
+        <root>/<key>/manifest.json  file hashes, embedding model, splitter settings
+
+    Indexes are read back memory-mapped so every worker shares the same pages.
+    The manifest mtime doubles as the last-used timestamp for cleanup.
+    """
+
+    def __init__(self, root: str, max_bytes: int, max_idle_days: float):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_idle_seconds = max_idle_days * 24 * 3600
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def load(self, key: str, embeddings):
+        path = self._path(key)
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return None
+
+        try:
+            index_path = os.path.join(path, INDEX_FILE)
+            try:
+                index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                # Older faiss builds only support mmap for some index types
+                index = faiss.read_index(index_path)
+            with open(os.path.join(path, DOCSTORE_FILE), "rb") as f:
+                docstore, index_to_docstore_id = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable index {key}: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+
+        os.utime(manifest_path)
+        return FAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=index_to_docstore_id,
+        )
+
+    def save(self, key: str, vectorstore, manifest: dict):
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+
+        # Write into a private directory first so other workers never see half an index
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+        os.makedirs(tmp_path)
+        try:
+            faiss.write_index(vectorstore.index, os.path.join(tmp_path, INDEX_FILE))
+            with open(os.path.join(tmp_path, DOCSTORE_FILE), "wb") as f:
+                pickle.dump((vectorstore.docstore, vectorstore.index_to_docstore_id), f)
+            with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+                json.dump({**manifest, "key": key, "created_at": time.time()}, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            # Lost the race against another worker saving the same key
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if not os.path.exists(path):
+                raise
+        self.cleanup()
+
+    def cleanup(self):
+        """Drop indexes idle for longer than max_idle_days, then oldest first down to max_bytes."""
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            manifest_path = os.path.join(entry.path, MANIFEST_FILE)
+            try:
+                last_used = os.path.getmtime(manifest_path)
+            except OSError:
+                # Leftover temp dir from a crashed save
+                if now - entry.stat().st_mtime > 3600:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                continue
+            if now - last_used > self.max_idle_seconds:
+                logger.info(f"Removing stale index {entry.name}")
+                shutil.rmtree(entry.path, ignore_errors=True)
+                continue
+            entries.append((last_used, entry.path, _dir_size(entry.path)))
+
+        total = sum(size for _, _, size in entries)
+        for _, path, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            logger.info(f"Evicting index {os.path.basename(path)} to stay under size cap")
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def stats(self) -> dict:
+        entries = [e for e in os.scandir(self.root) if e.is_dir() and "." not in e.name]
+        return {
+            "entries": len(entries),
+            "bytes": sum(_dir_size(e.path) for e in entries),
+            "max_bytes": self.max_bytes,
+        }
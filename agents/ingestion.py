@@ -0,0 +1,86 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from agents.extraction import EXTRACTORS, extract_text
+from agents.loaders import STREAMED_EXTENSIONS
+from agents.vectorstore import get_or_build_shard
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionQueue:
+    """
+    Background extraction + chunking + embedding of uploaded files, so that by
+    the time /api/topics asks for an index its shards are usually built already.
+    Status is tracked per filename, for its latest content; on_status(filename,
+    status) is called on every transition (queued, running, done, failed).
+    """
+
+    def __init__(self, max_workers: int, on_status=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingestion")
+        self._jobs = {}  # filename -> {"status", "error", "seconds", "content_hash", "future"}
+        self._lock = threading.Lock()
+        self.on_status = on_status
+
+    def _set(self, filename: str, job: dict, **fields):
+        with self._lock:
+            job.update(fields)
+            # A job for content that has since been replaced no longer reports status
+            current = self._jobs.get(filename) is job
+        if current and self.on_status and "status" in fields:
+            try:
+                self.on_status(filename, fields["status"])
+            except Exception as e:
+                logger.warning(f"Ingestion status callback failed for {filename}: {e}")
+
+    def _run(self, filename: str, path: str, job: dict):
+        self._set(filename, job, status="running")
+        started = time.perf_counter()
+        try:
+            ext = os.path.splitext(path)[1].lower()
+            # PDFs and CSVs are read page by page / row by row while embedding; joining
+            # them into one string up front would parse them twice and hold them whole
+            if ext in EXTRACTORS and ext not in STREAMED_EXTENSIONS:
+                extract_text(path)
+            get_or_build_shard(path)
+        except Exception as e:
+            logger.warning(f"Background ingestion of {filename} failed: {e}")
+            self._set(filename, job, status="failed", error=str(e), seconds=time.perf_counter() - started)
+            return
+        self._set(filename, job, status="done", seconds=time.perf_counter() - started)
+
+    def submit(self, filename: str, path: str, content_hash: str = None):
+        """
+        Queue ingestion of a file. A job still in flight for the same content is
+        reused; new content under the same filename gets a job of its own.
+        """
+        with self._lock:
+            job = self._jobs.get(filename)
+            if job and job["status"] in ("queued", "running") and job["content_hash"] == content_hash:
+                return job["future"]
+            job = {"status": "queued", "error": None, "seconds": None, "content_hash": content_hash, "future": None}
+            self._jobs[filename] = job
+        if self.on_status:
+            self.on_status(filename, "queued")
+        future = self._executor.submit(self._run, filename, path, job)
+        with self._lock:
+            job["future"] = future
+        return future
+
+    def status(self, filename: str):
+        with self._lock:
+            job = self._jobs.get(filename)
+            if job is None:
+                return None
+            return {k: v for k, v in job.items() if k not in ("future", "content_hash")}
+
+    def wait(self, filenames: list[str], timeout: float = None):
+        """Block until the background jobs for these files (if any) have finished."""
+        with self._lock:
+            futures = [self._jobs[f]["future"] for f in filenames
+                       if f in self._jobs and self._jobs[f]["future"] is not None]
+        if futures:
+            wait(futures, timeout=timeout)
@@ -0,0 +1,278 @@
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LLM_RPM = float(os.getenv("LLM_RPM", "500"))
+LLM_TPM = float(os.getenv("LLM_TPM", "200000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "6"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+# Embeddings have their own provider limits, budget and breaker
+EMBED_RPM = float(os.getenv("EMBED_RPM", "3000"))
+EMBED_TPM = float(os.getenv("EMBED_TPM", "1000000"))
+
+# Assumed completion size when budgeting tokens for a call
+EXPECTED_OUTPUT_TOKENS = 500
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while the circuit breaker is open."""
+
+
+class TokenBucket:
+    """Refills at rate units per second up to capacity. acquire() blocks until the units are available."""
+
+    def __init__(self, per_minute: float, sleep=time.sleep):
+        self.capacity = per_minute
+        self.sleep = sleep
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve now, possibly going negative; later callers queue up behind us
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            self.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    """
+    Opens after threshold consecutive failed calls and rejects calls for
+    cooldown seconds. After that one trial call is let through (half-open):
+    success closes the breaker, failure opens it again. A trial that ends any
+    other way (caller gave up, stream closed) is released for the next call.
+    """
+
+    def __init__(self, threshold: int, cooldown: float, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at < self.cooldown:
+            return "open"
+        return "half-open"
+
+    def before_call(self) -> bool:
+        """Raise while open. Returns True if this call is the half-open trial."""
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half-open" and self.trial_running):
+                raise CircuitOpenError("LLM provider unavailable, failing fast")
+            if state == "half-open":
+                self.trial_running = True
+                return True
+            return False
+
+    def release_trial(self):
+        with self._lock:
+            self.trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = self.clock()
+
+
+def _status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def is_retryable(error) -> bool:
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status == 408 or status >= 500
+    # Connection resets and timeouts carry no status code
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def retry_after(error):
+    """Seconds the provider asked us to wait, from a retry_after attribute or Retry-After headers."""
+    value = getattr(error, "retry_after", None)
+    if value is not None:
+        return float(value)
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + EXPECTED_OUTPUT_TOKENS
+
+
+class LLMExecutor:
+    """
+    Shared execution layer for LLM calls: a global requests- and tokens-per-minute
+    budget, exponential backoff with full jitter (or the provider's Retry-After)
+    for retryable errors, and a circuit breaker that fails fast while the
+    provider keeps failing.
+    """
+
+    def __init__(self, rpm: float, tpm: float, max_retries: int, backoff_base: float,
+                 backoff_max: float, breaker: CircuitBreaker, sleep=time.sleep):
+        # Budget waits use the injected sleep too, so tests never block on the clock
+        self.requests = TokenBucket(rpm, sleep)
+        self.tokens = TokenBucket(tpm, sleep)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+        self.queue_wait = 0.0
+        self.max_queue_wait = 0.0
+
+    def _wait_for_budget(self, est_tokens: int):
+        waited = self.requests.acquire(1) + self.tokens.acquire(est_tokens)
+        with self._lock:
+            self.calls += 1
+            self.queue_wait += waited
+            self.max_queue_wait = max(self.max_queue_wait, waited)
+
+    def _backoff(self, attempt: int, error) -> float:
+        with self._lock:
+            self.retries += 1
+            if _status_code(error) == 429:
+                self.rate_limited += 1
+        hinted = retry_after(error)
+        if hinted is not None:
+            return min(hinted, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _give_up(self, error):
+        with self._lock:
+            self.failures += 1
+        if is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            # The provider answered (400, 401, ...), it is up; the request itself was bad
+            self.breaker.record_success()
+
+    def execute(self, fn, est_tokens: int = EXPECTED_OUTPUT_TOKENS):
+        """Run fn() under the shared budget, retrying retryable errors."""
+        trial = self.breaker.before_call()
+        try:
+            for attempt in range(self.max_retries + 1):
+                self._wait_for_budget(est_tokens)
+                try:
+                    result = fn()
+                except Exception as e:
+                    if not is_retryable(e) or attempt == self.max_retries:
+                        self._give_up(e)
+                        raise
+                    delay = self._backoff(attempt, e)
+                    logger.warning(f"LLM call failed (attempt {attempt+1}/{self.max_retries+1}), retrying in {delay:.1f}s: {e}")
+                    self.sleep(delay)
+                    continue
+                self.breaker.record_success()
+                return result
+        finally:
+            if trial:
+                self.breaker.release_trial()
+
+    def invoke(self, llm, prompt: str):
+        return self.execute(lambda: llm.invoke(prompt), estimate_tokens(prompt))
+
+    def stream(self, llm, prompt: str):
+        """Stream token strings. Retries happen only while nothing has been yielded yet."""
+        trial = self.breaker.before_call()
+        try:
+            for attempt in range(self.max_retries + 1):
+                self._wait_for_budget(estimate_tokens(prompt))
+                started = False
+                try:
+                    for chunk in llm.stream(prompt):
+                        if chunk.content:
+                            started = True
+                            yield chunk.content
+                except Exception as e:
+                    if started or not is_retryable(e) or attempt == self.max_retries:
+                        self._give_up(e)
+                        raise
+                    delay = self._backoff(attempt, e)
+                    logger.warning(f"LLM stream failed (attempt {attempt+1}/{self.max_retries+1}), retrying in {delay:.1f}s: {e}")
+                    self.sleep(delay)
+                    continue
+                self.breaker.record_success()
+                return
+        finally:
+            # Also runs on GeneratorExit, e.g. an SSE client that disconnected mid-stream
+            if trial:
+                self.breaker.release_trial()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "failures": self.failures,
+                "queue_wait_seconds_total": round(self.queue_wait, 3),
+                "queue_wait_seconds_avg": round(self.queue_wait / self.calls, 4) if self.calls else None,
+                "queue_wait_seconds_max": round(self.max_queue_wait, 3),
+                "circuit": self.breaker.state,
+            }
+
+
+llm_executor = LLMExecutor(
+    rpm=LLM_RPM,
+    tpm=LLM_TPM,
+    max_retries=LLM_MAX_RETRIES,
+    backoff_base=LLM_BACKOFF_BASE,
+    backoff_max=LLM_BACKOFF_MAX,
+    breaker=CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN),
+)
+
+# Separate so a failing bulk re-index cannot open the breaker for tutoring calls
+embedding_executor = LLMExecutor(
+    rpm=EMBED_RPM,
+    tpm=EMBED_TPM,
+    max_retries=LLM_MAX_RETRIES,
+    backoff_base=LLM_BACKOFF_BASE,
+    backoff_max=LLM_BACKOFF_MAX,
+    breaker=CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN),
+)
@@ -0,0 +1,31 @@
+"""
+Entry points of the loader worker processes (see loaders.load_files).
+
+Workers are spawned, so they start from a fresh interpreter: keep this module
+and its imports free of side effects. The app's caches are configured by
+init_worker instead.
+"""
+import time
+
+from agents import extraction, ocr
+
+
+def init_worker(extraction_root, ocr_root):
+    # Spawned workers start without the app's configuration, share its caches
+    if extraction_root and extraction.extraction_cache is None:
+        extraction.configure_extraction_cache(extraction_root)
+    if ocr_root and ocr.ocr_cache is None:
+        ocr.configure_ocr_cache(ocr_root)
+
+
+def timed_load(path: str):
+    """(documents, seconds, OCR counter delta) for one file; the counters only live in this process."""
+    # Not at module level: agents.loaders imports this module
+    from agents.loaders import load_file
+
+    before = ocr.counters()
+    started = time.perf_counter()
+    documents = load_file(path)
+    seconds = time.perf_counter() - started
+    after = ocr.counters()
+    return documents, seconds, {name: after[name] - before[name] for name in after}
@@ -1,56 +1,130 @@
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
 from langchain_core.documents import Document
-try:
-    import pytesseract
-except ImportError:
-    pytesseract = None
-from PIL import Image
-import nbformat
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
 import os
+import threading
+import time
+from agents import extraction, loader_worker, ocr
+from agents.csv_rows import iter_packed_rows
+from agents.extraction import extract_text, iter_pdf_pages
+
+# OCR and DOCX/notebook parsing hold the GIL, they get their own processes
+CPU_BOUND_EXTENSIONS = {".jpg", ".png", ".jpeg", ".docx", ".ipynb"}
+LOADER_PROCESSES = int(os.getenv("LOADER_PROCESSES", str(min(4, os.cpu_count() or 1))))
+LOADER_THREADS = int(os.getenv("LOADER_THREADS", "4"))
+# Read lazily while being embedded instead of being loaded up front
+STREAMED_EXTENSIONS = {".pdf", ".csv"}
+# Packed CSV chunks stay under this many characters (callers pass their splitter's chunk size)
+CSV_CHUNK_CHARS = int(os.getenv("CSV_CHUNK_CHARS", "800"))
 
 def load_file(path: str) -> list[Document]:
     ext = os.path.splitext(path)[1].lower()
 
     if ext == ".pdf":
-        print(f"INFO: Skipping PDF file {path} as it is not supported.")
-        return []
+        return list(iter_documents(path))
 
     if ext in [".jpg", ".png", ".jpeg"]:
-        if pytesseract is None:
+        if ocr.pytesseract is None:
             print(f"WARNING: pytesseract not installed. Skipping image {path}")
             return []
         try:
-            text = pytesseract.image_to_string(Image.open(path))
+            text = ocr.ocr_image(path)
             return [Document(page_content=text, metadata={"source": path})]
         except Exception as e:
             print(f"WARNING: Failed to process image {path} with OCR: {e}")
             return []
 
-    if ext == ".ipynb":
-        nb = nbformat.read(path, as_version=4)
-        cells = []
-        for cell in nb.cells:
-            if cell.cell_type in ("markdown", "code"):
-                cells.append(cell.source)
-        return [Document(
-            page_content="\n".join(cells),
-            metadata={"source": path}
-        )]
-
-    if ext == ".txt":
-        return TextLoader(path, encoding='utf-8').load()
-
-    if ext == ".docx":
-        try:
-            from docx import Document as DocxDocument
-            doc = DocxDocument(path)
-            text = "\n".join([para.text for para in doc.paragraphs])
-            return [Document(page_content=text, metadata={"source": path})]
-        except ImportError:
-            raise ValueError("python-docx not installed")
+    if ext in [".ipynb", ".txt", ".docx"]:
+        return [Document(page_content=extract_text(path), metadata={"source": path})]
 
     if ext == ".csv":
-        # Treating CSV as plain text for simplicity in RAG
-        return TextLoader(path, encoding='utf-8').load()
+        return list(iter_csv_documents(path))
 
     raise ValueError(f"Nieobsługiwany format: {ext}")
+
+
+def iter_csv_documents(path: str, chunk_size: int = CSV_CHUNK_CHARS):
+    """Stream a CSV as documents of whole rows packed up to chunk_size characters (see csv_rows)."""
+    try:
+        for text, first_row, last_row in iter_packed_rows(path, chunk_size):
+            yield Document(page_content=text, metadata={"source": path, "rows": f"{first_row}-{last_row}"})
+    except UnicodeDecodeError:
+        raise ValueError(f"Unsupported file format: {path}")
+
+
+def iter_documents(path: str, chunk_size: int = CSV_CHUNK_CHARS):
+    """Documents of a file, produced lazily for PDFs (per page) and CSVs (per packed rows)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pdf":
+        return (
+            Document(page_content=text, metadata={"source": path, "page": number})
+            for number, text in iter_pdf_pages(path)
+        )
+    if ext == ".csv":
+        return iter_csv_documents(path, chunk_size)
+    return load_file(path)
+
+
+_process_pool = None
+_thread_pool = ThreadPoolExecutor(max_workers=LOADER_THREADS, thread_name_prefix="loader")
+_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is None:
+            caches = (extraction.extraction_cache, ocr.ocr_cache)
+            # Never fork: the app is multithreaded (pools, SQLite connections) and a forked
+            # child can inherit a lock held by another thread and deadlock on it. Spawned
+            # workers also import the app's main module as __mp_main__, so its startup
+            # code must stay behind a __name__ check (see backend/app.py)
+            _process_pool = ProcessPoolExecutor(
+                max_workers=LOADER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=loader_worker.init_worker,
+                initargs=tuple(cache.root if cache is not None else None for cache in caches),
+            )
+        return _process_pool
+
+
+def _timed_load(path: str):
+    started = time.perf_counter()
+    documents = load_file(path)
+    return documents, time.perf_counter() - started
+
+
+def load_files(paths: list[str], chunk_size: int = CSV_CHUNK_CHARS):
+    """
+    Load several files in parallel: CPU-bound formats in a process pool, the rest
+    on threads. Yields (path, documents, seconds) in input order, each as soon as
+    it and every file before it are loaded, so callers can embed early files
+    while later ones are still being parsed. Errors are raised at the failing file.
+    PDFs and CSVs are not loaded here: their documents come as a lazy iterator
+    (see iter_documents) and the reported seconds are 0.
+    """
+    futures = []
+    for path in paths:
+        ext = os.path.splitext(path)[1].lower()
+        if ext in STREAMED_EXTENSIONS:
+            futures.append((path, None))
+            continue
+        if ext in CPU_BOUND_EXTENSIONS and LOADER_PROCESSES > 1:
+            futures.append((path, _get_process_pool().submit(loader_worker.timed_load, path)))
+        else:
+            futures.append((path, _thread_pool.submit(_timed_load, path)))
+
+    try:
+        for path, future in futures:
+            if future is None:
+                yield path, iter_documents(path, chunk_size), 0.0
+                continue
+            documents, seconds, *ocr_delta = future.result()
+            if ocr_delta:
+                ocr.merge_counters(ocr_delta[0])
+            yield path, documents, seconds
+    finally:
+        # Consumer stopped early (or a load failed): drop what has not started yet
+        for _, future in futures:
+            if future is not None:
+                future.cancel()
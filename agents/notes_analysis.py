@@ -0,0 +1,324 @@
+import html
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.disk_cache import DiskCache
+from agents.hashing import text_hash
+from agents.llm_executor import llm_executor, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_MODEL = "gpt-4.1"
+# Bump whenever a prompt or the rendering changes, cached analyses are then ignored
+PROMPT_VERSION = "1"
+
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+
+# Notes longer than this are analyzed in segments instead of one call
+SEGMENT_MAX_CHARS = int(os.getenv("ANALYSIS_SEGMENT_MAX_CHARS", "15000"))
+# Concurrent segment calls per analysis
+ANALYSIS_MAX_WORKERS = int(os.getenv("ANALYSIS_MAX_WORKERS", "4"))
+
+SYSTEM_PROMPT = "You are a study assistant. Return ONLY valid JSON with 'summary' and 'highlighted_html' keys. No markdown code blocks. Properly escape all special characters in JSON strings."
+
+FALLBACK_SUMMARY = "Summary generation failed - displaying original content."
+
+# How highlighted_html is produced when the request does not say:
+# "html" has the model rewrite the notes, "annotations" has it list phrases we render ourselves
+DEFAULT_RENDER = os.getenv("ANALYSIS_RENDER", "html")
+
+HIGHLIGHT_CATEGORIES = ("definition", "concept", "important", "example")
+
+# Disabled until the app tells us where to keep results
+analysis_cache = None
+
+
+def configure_analysis_cache(root: str):
+    global analysis_cache
+    analysis_cache = DiskCache(root, ANALYSIS_CACHE_MAX_BYTES, suffix=".json")
+    return analysis_cache
+
+
+def analysis_cache_key(content: str, render: str, segmented: bool) -> str:
+    """Changes with the note text, the model, the prompts and the analysis mode."""
+    return text_hash(PROMPT_VERSION, ANALYSIS_MODEL, render, str(segmented), text_hash(content))
+
+
+def get_cached_analysis(key: str):
+    if analysis_cache is None:
+        return None
+    cached = analysis_cache.get(key)
+    return json.loads(cached) if cached is not None else None
+
+
+def cache_analysis(key: str, result: dict):
+    # Fallback results are not worth keeping, the next request should retry
+    if analysis_cache is not None and result.get('ok'):
+        analysis_cache.put(key, json.dumps(result).encode("utf-8"))
+
+
+def _html_prompt(content: str) -> str:
+    return f"""Analyze the following study notes. Return a JSON object with:
+1. "summary": A concise summary (3-5 sentences) of the key points.
+2. "highlighted_html": The text with HTML spans for highlighting:
+   - <span class="highlight-definition">text</span> for definitions
+   - <span class="highlight-concept">text</span> for key concepts
+   - <span class="highlight-important">text</span> for important notes
+   - <span class="highlight-example">text</span> for examples
+
+IMPORTANT: Return ONLY valid JSON, no markdown, no code blocks. Escape all quotes and special characters properly.
+
+Notes to analyze:
+
+{content}"""
+
+
+def parse_json_response(result_text: str):
+    """Parse a JSON object out of an LLM reply, repairing the usual issues. None if hopeless."""
+    result_text = result_text.strip()
+
+    # Remove markdown code blocks if present
+    if result_text.startswith('```'):
+        lines = result_text.split('\n')
+        # Remove first line (```json) and last line (```)
+        lines = [l for l in lines if not l.strip().startswith('```')]
+        result_text = '\n'.join(lines)
+
+    # Try to find JSON object in response
+    start_idx = result_text.find('{')
+    end_idx = result_text.rfind('}')
+
+    if start_idx != -1 and end_idx != -1:
+        result_text = result_text[start_idx:end_idx + 1]
+
+    try:
+        return json.loads(result_text)
+    except json.JSONDecodeError:
+        # Fallback: replace unescaped newlines in strings
+        result_text = re.sub(r'(?<!\\)\n', '\\n', result_text)
+        try:
+            return json.loads(result_text)
+        except json.JSONDecodeError:
+            return None
+
+
+def analyze_text(client, content: str) -> dict:
+    """Single-call analysis. Returns summary + highlighted_html, falling back to the plain text."""
+    response = llm_executor.execute(lambda: client.chat.completions.create(
+        model=ANALYSIS_MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": _html_prompt(content)}
+        ],
+        temperature=0.3,
+        max_tokens=16000
+    ), estimate_tokens(content) + len(content) // 4)
+
+    result = parse_json_response(response.choices[0].message.content)
+    if result is None:
+        # Last resort: return original content with basic highlighting
+        return {'summary': FALLBACK_SUMMARY, 'highlighted_html': f'<p>{content}</p>', 'ok': False}
+
+    return {
+        'summary': result.get('summary', ''),
+        'highlighted_html': result.get('highlighted_html', content),
+        'ok': True
+    }
+
+
+def _annotation_prompt(content: str) -> str:
+    return f"""Analyze the following study notes. Return a JSON object with:
+1. "summary": A concise summary (3-5 sentences) of the key points.
+2. "annotations": An array of objects {{"text": ..., "category": ...}} marking passages worth highlighting.
+   - "text" must be copied EXACTLY from the notes (a word, phrase or sentence, never spanning paragraphs)
+   - "category" is one of: "definition", "concept", "important", "example"
+   - List them in the order they appear in the notes.
+
+Do NOT repeat the notes themselves. Return ONLY valid JSON.
+
+Notes to analyze:
+
+{content}"""
+
+
+def _escape(text: str) -> str:
+    return html.escape(text, quote=False).replace("\n\n", "</p><p>").replace("\n", "<br>")
+
+
+def render_highlights(content: str, annotations: list) -> str:
+    """
+    Render notes as HTML with highlight-* spans. Each annotation is either a
+    phrase ("text") located in the notes, or a character span ("start", "end").
+    Unknown categories, phrases that cannot be found and overlapping spans are dropped.
+    """
+    spans = []
+    cursor = 0
+    for annotation in annotations:
+        if not isinstance(annotation, dict):
+            continue
+        category = annotation.get("category")
+        if category not in HIGHLIGHT_CATEGORIES:
+            continue
+        start, end = annotation.get("start"), annotation.get("end")
+        if isinstance(start, int) and isinstance(end, int) and 0 <= start < end <= len(content):
+            spans.append((start, end, category))
+            continue
+        phrase = (annotation.get("text") or "").strip()
+        if not phrase:
+            continue
+        # Annotations come in document order, so look after the previous one first
+        start = content.find(phrase, cursor)
+        if start == -1:
+            start = content.find(phrase)
+        if start == -1:
+            continue
+        spans.append((start, start + len(phrase), category))
+        cursor = start + len(phrase)
+
+    parts = []
+    pos = 0
+    for start, end, category in sorted(spans):
+        # Spans never cross paragraphs, otherwise the <p> tags would not nest
+        if start < pos or "\n\n" in content[start:end]:
+            continue
+        parts.append(_escape(content[pos:start]))
+        parts.append(f'<span class="highlight-{category}">{_escape(content[start:end])}</span>')
+        pos = end
+    parts.append(_escape(content[pos:]))
+    return "<p>" + "".join(parts) + "</p>"
+
+
+def annotate_text(client, content: str) -> dict:
+    """
+    Single-call analysis where the model only returns annotations, not the notes.
+    Output is a small fraction of the input and highlighted_html is rendered here.
+    """
+    response = llm_executor.execute(lambda: client.chat.completions.create(
+        model=ANALYSIS_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a study assistant. Return ONLY valid JSON with 'summary' and 'annotations' keys."},
+            {"role": "user", "content": _annotation_prompt(content)}
+        ],
+        temperature=0.3,
+        max_tokens=4000,
+        response_format={"type": "json_object"}
+    ), estimate_tokens(content))
+
+    result = parse_json_response(response.choices[0].message.content)
+    if result is None or not isinstance(result.get("annotations", []), list):
+        return {'summary': FALLBACK_SUMMARY, 'highlighted_html': render_highlights(content, []), 'ok': False}
+
+    annotations = result.get("annotations", [])
+    return {
+        'summary': result.get('summary', ''),
+        'highlighted_html': render_highlights(content, annotations),
+        'annotations': annotations,
+        'ok': True
+    }
+
+
+ANALYZERS = {
+    "html": analyze_text,
+    "annotations": annotate_text,
+}
+
+
+def split_segments(content: str, max_chars: int = SEGMENT_MAX_CHARS) -> list[str]:
+    """
+    Split text into segments of at most max_chars, cutting on paragraph
+    boundaries, then line boundaries, and only as a last resort mid-line.
+    """
+    pieces = []
+    for paragraph in content.split("\n\n"):
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        line_block = ""
+        for line in paragraph.split("\n"):
+            while len(line) > max_chars:
+                if line_block:
+                    pieces.append(line_block)
+                    line_block = ""
+                pieces.append(line[:max_chars])
+                line = line[max_chars:]
+            if line_block and len(line_block) + 1 + len(line) > max_chars:
+                pieces.append(line_block)
+                line_block = line
+            else:
+                line_block = f"{line_block}\n{line}" if line_block else line
+        if line_block:
+            pieces.append(line_block)
+
+    segments = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 2 + len(piece) > max_chars:
+            segments.append(current)
+            current = piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current.strip():
+        segments.append(current)
+    return segments
+
+
+def _reduce_summaries(client, summaries: list[str]) -> str:
+    joined = "\n\n".join(f"Part {i + 1}: {s}" for i, s in enumerate(summaries))
+    response = llm_executor.execute(lambda: client.chat.completions.create(
+        model=ANALYSIS_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a study assistant."},
+            {"role": "user", "content": f"""These are summaries of consecutive parts of one set of study notes.
+Combine them into a single concise summary (3-5 sentences) of the key points. Return only the summary text.
+
+{joined}"""}
+        ],
+        temperature=0.3,
+        max_tokens=1000
+    ), estimate_tokens(joined))
+    return response.choices[0].message.content.strip()
+
+
+def analyze_segmented(client, content: str, analyze_segment=analyze_text,
+                      max_chars: int = SEGMENT_MAX_CHARS, max_workers: int = ANALYSIS_MAX_WORKERS) -> dict:
+    """
+    Map-reduce analysis for long notes: segments are analyzed concurrently by
+    analyze_segment, their HTML is concatenated in order and their summaries
+    are reduced into one. Per-segment timings are returned alongside.
+    """
+    segments = split_segments(content, max_chars)
+
+    def run(segment):
+        started = time.perf_counter()
+        try:
+            result = analyze_segment(client, segment)
+        except Exception as e:
+            logger.warning(f"Segment analysis failed: {e}")
+            result = {'summary': '', 'highlighted_html': f'<p>{segment}</p>', 'ok': False}
+        return result, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(segments)))) as pool:
+        outcomes = list(pool.map(run, segments))
+
+    summaries = [r['summary'] for r, _ in outcomes if r['ok'] and r['summary']]
+    if not summaries:
+        summary = FALLBACK_SUMMARY
+    elif len(summaries) == 1:
+        summary = summaries[0]
+    else:
+        summary = _reduce_summaries(client, summaries)
+
+    return {
+        'summary': summary,
+        'highlighted_html': "\n".join(r['highlighted_html'] for r, _ in outcomes),
+        # A partial result is still returned, but only a complete one may be cached
+        'ok': all(r['ok'] for r, _ in outcomes),
+        'segments': [
+            {'index': i, 'chars': len(segment), 'seconds': round(seconds, 3), 'ok': r['ok']}
+            for i, (segment, (r, seconds)) in enumerate(zip(segments, outcomes))
+        ]
+    }
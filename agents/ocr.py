@@ -0,0 +1,198 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+from agents.disk_cache import DiskCache
+from agents.hashing import file_hash, text_hash
+
+logger = logging.getLogger(__name__)
+
+# Bump when preprocessing or tesseract settings change, old entries are then ignored
+OCR_VERSION = "1"
+
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Tesseract is most accurate around 300 DPI, scans above that are only slower
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+# Used instead when the image carries no DPI metadata (photos, screenshots)
+OCR_MAX_PIXELS = int(os.getenv("OCR_MAX_PIXELS", str(8 * 1024 * 1024)))
+# Taller images are cut into horizontal bands that are recognized in parallel
+OCR_TILE_HEIGHT = int(os.getenv("OCR_TILE_HEIGHT", "2000"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "4"))
+
+# Disabled until the app tells us where to keep OCR output
+ocr_cache = None
+
+# tesseract runs as a subprocess, so threads are enough to use several cores
+_executor = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="ocr")
+_stats_lock = threading.Lock()
+_stats = {"images": 0, "ocr_seconds": 0.0}
+
+
+def configure_ocr_cache(root: str):
+    global ocr_cache
+    ocr_cache = DiskCache(root, OCR_CACHE_MAX_BYTES, suffix=".txt")
+    return ocr_cache
+
+
+def _scale(image: Image.Image) -> float:
+    dpi = image.info.get("dpi")
+    if dpi and dpi[0] and float(dpi[0]) > OCR_TARGET_DPI:
+        return OCR_TARGET_DPI / float(dpi[0])
+    pixels = image.width * image.height
+    if not dpi and pixels > OCR_MAX_PIXELS:
+        return (OCR_MAX_PIXELS / pixels) ** 0.5
+    return 1.0
+
+
+def _otsu_threshold(image: Image.Image) -> int:
+    """Gray level that best separates ink from paper, from the histogram of an L image."""
+    histogram = image.histogram()
+    total = sum(histogram)
+    sum_all = sum(level * count for level, count in enumerate(histogram))
+    sum_below = 0
+    weight_below = 0
+    best_level, best_variance = 127, 0.0
+    for level, count in enumerate(histogram):
+        weight_below += count
+        if weight_below == 0:
+            continue
+        weight_above = total - weight_below
+        if weight_above == 0:
+            break
+        sum_below += level * count
+        mean_below = sum_below / weight_below
+        mean_above = (sum_all - sum_below) / weight_above
+        variance = weight_below * weight_above * (mean_below - mean_above) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def preprocess(image: Image.Image) -> Image.Image:
+    """Downscale to the target resolution, grayscale and binarize."""
+    image = ImageOps.exif_transpose(image)
+    scale = _scale(image)
+    if scale < 1.0:
+        image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))), Image.LANCZOS)
+    gray = ImageOps.autocontrast(image.convert("L"))
+    threshold = _otsu_threshold(gray)
+    return gray.point(lambda level: 255 if level > threshold else 0, mode="L")
+
+
+def _cut_row(image: Image.Image, target: int, window: int) -> int:
+    """Row near target with the least ink, so bands are not cut through a line of text."""
+    top = max(1, target - window)
+    bottom = min(image.height - 1, target + window)
+    if bottom <= top:
+        return target
+    # Averaging each row down to one pixel gives its brightness
+    band = image.crop((0, top, image.width, bottom)).resize((1, bottom - top), Image.BOX)
+    rows = list(band.getdata())
+    return top + max(range(len(rows)), key=lambda i: (rows[i], -abs(top + i - target)))
+
+
+def tiles(image: Image.Image) -> list:
+    if image.height <= OCR_TILE_HEIGHT:
+        return [image]
+    bands = []
+    top = 0
+    while image.height - top > OCR_TILE_HEIGHT:
+        cut = _cut_row(image, top + OCR_TILE_HEIGHT, OCR_TILE_HEIGHT // 10)
+        bands.append(image.crop((0, top, image.width, cut)))
+        top = cut
+    bands.append(image.crop((0, top, image.width, image.height)))
+    return bands
+
+
+def _recognize(image: Image.Image) -> str:
+    bands = tiles(preprocess(image))
+    if len(bands) == 1:
+        return pytesseract.image_to_string(bands[0])
+    return "\n".join(_executor.map(pytesseract.image_to_string, bands))
+
+
+def _cache_key(content_hash: str) -> str:
+    return text_hash(OCR_VERSION, str(OCR_TARGET_DPI), str(OCR_MAX_PIXELS), content_hash)
+
+
+def ocr_image(path: str) -> str:
+    """
+    Text of an image via tesseract, cached by content hash. Each image is
+    preprocessed and, if very tall, recognized band by band in parallel.
+    """
+    return _cached_ocr(_cache_key(file_hash(path)), lambda: Image.open(path), os.path.basename(path))
+
+
+def ocr_image_data(data: bytes, name: str = "image") -> str:
+    """Same as ocr_image for an encoded image held in memory, e.g. a scanned PDF page."""
+    return _cached_ocr(_cache_key(hashlib.sha256(data).hexdigest()), lambda: Image.open(io.BytesIO(data)), name)
+
+
+def _cached_ocr(key: str, open_image, name: str) -> str:
+    if pytesseract is None:
+        raise ValueError("pytesseract not installed")
+
+    if ocr_cache is not None:
+        cached = ocr_cache.get(key)
+        if cached is not None:
+            logger.info(f"OCR cache hit for {name}")
+            return cached.decode("utf-8")
+
+    started = time.perf_counter()
+    with open_image() as image:
+        text = _recognize(image)
+    seconds = time.perf_counter() - started
+    with _stats_lock:
+        _stats["images"] += 1
+        _stats["ocr_seconds"] += seconds
+
+    if ocr_cache is not None:
+        ocr_cache.put(key, text.encode("utf-8"))
+        cache_stats = ocr_cache.stats()
+        lookups = cache_stats["hits"] + cache_stats["misses"]
+        hit_rate = f", cache hit rate {cache_stats['hits'] / lookups:.0%}" if lookups else ""
+    else:
+        hit_rate = ""
+    logger.info(f"OCR of {name} took {seconds:.2f}s{hit_rate}")
+    return text
+
+
+def counters() -> dict:
+    """This process's raw counters; loader processes send the difference back with each file."""
+    with _stats_lock:
+        result = dict(_stats)
+    cache_stats = ocr_cache.stats() if ocr_cache is not None else {}
+    result["cache_hits"] = cache_stats.get("hits", 0)
+    result["cache_misses"] = cache_stats.get("misses", 0)
+    return result
+
+
+def merge_counters(delta: dict):
+    """Add counters reported by a loader process, which the app's stats would not see otherwise."""
+    with _stats_lock:
+        _stats["images"] += delta["images"]
+        _stats["ocr_seconds"] += delta["ocr_seconds"]
+    if ocr_cache is not None:
+        ocr_cache.record_lookups(delta["cache_hits"], delta["cache_misses"])
+
+
+def stats() -> dict:
+    with _stats_lock:
+        result = {
+            "images_recognized": _stats["images"],
+            "ocr_seconds_total": round(_stats["ocr_seconds"], 3),
+            "ocr_seconds_avg": round(_stats["ocr_seconds"] / _stats["images"], 3) if _stats["images"] else None,
+        }
+    result["cache"] = ocr_cache.stats() if ocr_cache is not None else None
+    return result
@@ -0,0 +1,209 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+import copy
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SessionRegistry:
+    """
+    In-process store of active StudentAgent sessions.
+
+    Sessions idle for longer than idle_ttl seconds are dropped, and the least
+    recently used ones are evicted once max_sessions or max_bytes is exceeded.
+    Sizes come from agent.memory_bytes() (what the session owns) plus
+    agent.shared_index, shard key -> bytes of indexes several sessions may use;
+    each shared shard is counted once however many sessions hold it.
+    """
+
+    def __init__(self, max_sessions: int, max_bytes: int, idle_ttl: float):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self._sessions = OrderedDict()  # session_id -> [agent, last_used, size, shared]
+        self._shared = {}  # shard key -> [sessions holding it, bytes]
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, session_id: str):
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            self._sessions.move_to_end(session_id)
+            entry[1] = now
+            # Transcripts grow over a session, keep the accounting current
+            size = entry[0].memory_bytes()
+            self.bytes += size - entry[2]
+            entry[2] = size
+            return entry[0]
+
+    def put(self, session_id: str, agent):
+        size = agent.memory_bytes()
+        now = time.time()
+        with self._lock:
+            self._remove(session_id)
+            shared = dict(getattr(agent, "shared_index", {}))
+            self._sessions[session_id] = [agent, now, size, shared]
+            self.bytes += size
+            for key, shared_size in shared.items():
+                entry = self._shared.setdefault(key, [0, shared_size])
+                if entry[0] == 0:
+                    self.bytes += shared_size
+                entry[0] += 1
+            self._expire(now)
+            while len(self._sessions) > 1 and (
+                len(self._sessions) > self.max_sessions or self.bytes > self.max_bytes
+            ):
+                evicted_id = next(iter(self._sessions))
+                logger.info(f"Evicting session {evicted_id} to stay within limits")
+                self._remove(evicted_id)
+                self.evicted += 1
+
+    def pop(self, session_id: str):
+        with self._lock:
+            return self._remove(session_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire(time.time())
+            return {
+                "sessions": len(self._sessions),
+                "bytes": self.bytes,
+                "shared_shards": len(self._shared),
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "idle_ttl": self.idle_ttl,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
+
+    def _remove(self, session_id: str):
+        entry = self._sessions.pop(session_id, None)
+        if entry is None:
+            return None
+        self.bytes -= entry[2]
+        for key in entry[3]:
+            shared = self._shared[key]
+            shared[0] -= 1
+            if shared[0] == 0:
+                self.bytes -= shared[1]
+                del self._shared[key]
+        return entry[0]
+
+    def _expire(self, now: float):
+        # Oldest entries are at the front, so stop at the first live one
+        while self._sessions:
+            session_id, (_, last_used, _, _) = next(iter(self._sessions.items()))
+            if now - last_used <= self.idle_ttl:
+                break
+            self._remove(session_id)
+            self.expired += 1
+
+
+class SessionBackend(ABC):
+    """
+    Shared store of serialized session state (see StudentAgent.to_state), so any
+    worker can serve any session. save() returns the new version number, which
+    workers compare against their cached agent to detect updates made elsewhere.
+    """
+
+    @abstractmethod
+    def load(self, session_id: str):
+        ...
+
+    @abstractmethod
+    def save(self, session_id: str, state: dict) -> int:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        ...
+
+
+class MemorySessionBackend(SessionBackend):
+    """Single-process backend, for running without a shared store."""
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str):
+        with self._lock:
+            state = self._states.get(session_id)
+            return copy.deepcopy(state) if state is not None else None
+
+    def save(self, session_id: str, state: dict) -> int:
+        with self._lock:
+            previous = self._states.get(session_id)
+            version = previous["version"] + 1 if previous else 1
+            self._states[session_id] = {**copy.deepcopy(state), "version": version}
+            return version
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._states.pop(session_id, None)
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """Session state in a local SQLite file shared by all workers on the host."""
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " id TEXT PRIMARY KEY, state TEXT NOT NULL,"
+                " version INTEGER NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def load(self, session_id: str):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT state, version FROM sessions WHERE id = ? AND updated_at > ?",
+                (session_id, time.time() - self.ttl),
+            ).fetchone()
+        if row is None:
+            return None
+        return {**json.loads(row[0]), "version": row[1]}
+
+    def save(self, session_id: str, state: dict) -> int:
+        now = time.time()
+        state = {k: v for k, v in state.items() if k != "version"}
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sessions (id, state, version, updated_at) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(id) DO UPDATE SET state = excluded.state,"
+                " version = sessions.version + 1, updated_at = excluded.updated_at",
+                (session_id, json.dumps(state), now),
+            )
+            version = conn.execute("SELECT version FROM sessions WHERE id = ?", (session_id,)).fetchone()[0]
+            conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl,))
+        return version
+
+    def delete(self, session_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
@@ -1,57 +1,141 @@
 import json
 import logging
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
 # from backend.app import app  # Removed to avoid circular import
 # Actually, I don't need app here. I need to be careful with imports.
 
 import sys
 import os
+from concurrent.futures import Future, ThreadPoolExecutor
 
 # Helper to ensure we can import from agents folder
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from agents.loaders import load_file
-from agents.vectorstore import build_vectorstore
+from agents.vectorstore import (
+    compose_vectorstore,
+    estimate_index_bytes,
+    get_or_build_shards,
+    load_vectorstore,
+)
 from agents.tutor import build_tutor
+from agents.clients import get_chat_model
+from agents.llm_executor import llm_executor
+from agents.history import RollingHistory, count_tokens
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Finished sessions are graded here while the student is still on the chat page
+_evaluation_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("EVALUATION_PRECOMPUTE_WORKERS", "4")), thread_name_prefix="evaluation"
+)
+
 class StudentAgent:
-    def __init__(self):
+    def __init__(self, evaluator_llm=None, topic_generator_llm=None):
         self.vectorstore = None
+        self.index_bytes = 0  # index memory owned by this session only
+        self.shared_index = {}  # shard key -> bytes, for a shard used as-is (shared with other sessions)
+        self.file_paths = []
+        self.index_keys = []
+        self.load_timings = {}  # path -> load/embed seconds of the last process_files
+        self.state_version = None
         self.tutor_chain = None
         self.current_topic = None
         self.history = []
         self.questions_asked = 0
         self.target_questions = 3
-        self.evaluator_llm = ChatOpenAI(model="gpt-4.1", temperature=0.3)
-        self.topic_generator_llm = ChatOpenAI(model="gpt-4.1", temperature=0.5)
-
-    def _invoke_with_retry(self, llm, prompt, retries=10):
-        """Helper to invoke LLM with retries."""
-        for attempt in range(retries):
-            try:
-                response = llm.invoke(prompt)
-                return response
-            except Exception as e:
-                logger.warning(f"LLM invoke failed (attempt {attempt+1}/{retries}): {e}")
-                if attempt == retries - 1:
-                    raise e
-        return None
+        # Older turns are folded into a summary so the prompt stays within a token budget
+        self.history_window = RollingHistory()
+        self.last_prompt_tokens = None
+        # Speculative evaluation: (transcript key, Future) started when the session finishes
+        self._evaluation = None
+        # Injectable so tests can run against fake (streaming) chat models
+        self.evaluator_llm = evaluator_llm or get_chat_model("gpt-4.1", 0.3, "evaluator")
+        self.topic_generator_llm = topic_generator_llm or get_chat_model("gpt-4.1", 0.5, "topics")
+
+    def _invoke_with_retry(self, llm, prompt):
+        """Invoke the LLM through the shared rate-limited executor (backoff + circuit breaker)."""
+        return llm_executor.invoke(llm, prompt)
+
+    def _stream_with_retry(self, llm, prompt):
+        """Stream LLM tokens through the shared executor. Retries only before the first token."""
+        return llm_executor.stream(llm, prompt)
 
     def process_files(self, file_paths: list[str]):
-        """Load files and build vectorstore."""
+        """Load files and build vectorstore (reused from the process-wide cache when possible)."""
         logger.info(f"Processing files: {file_paths}")
         try:
-            self.vectorstore = build_vectorstore(file_paths)
+            self.load_timings = {}
+            shards = get_or_build_shards(file_paths, self.load_timings)
+            self.vectorstore = compose_vectorstore(list(shards.values()))
+            self.file_paths = list(file_paths)
+            self.index_keys = list(shards)
+            self._account_index()
+            for path, timing in self.load_timings.items():
+                logger.info(f"{os.path.basename(path)}: {timing}")
             logger.info("Vectorstore built successfully.")
         except Exception as e:
             logger.error(f"Error building vectorstore: {e}")
             raise e
 
+    def to_state(self) -> dict:
+        """Serializable session state. The index is referenced by shard keys, not copied."""
+        return {
+            "current_topic": self.current_topic,
+            "history": self.history,
+            "questions_asked": self.questions_asked,
+            "target_questions": self.target_questions,
+            "history_summary": self.history_window.summary,
+            "summarized_upto": self.history_window.summarized_upto,
+            "file_paths": self.file_paths,
+            "index_keys": self.index_keys,
+        }
+
+    def load_state(self, state: dict):
+        """Apply conversation fields from a stored state (the index is assumed unchanged)."""
+        self.current_topic = state["current_topic"]
+        self.history = state["history"]
+        self.questions_asked = state["questions_asked"]
+        self.target_questions = state["target_questions"]
+        self.history_window.reset(state.get("history_summary", ""), state.get("summarized_upto", 0))
+        self.state_version = state.get("version")
+
+    @classmethod
+    def from_state(cls, state: dict) -> "StudentAgent":
+        """Rehydrate a session, e.g. in another worker, from persisted shards without re-embedding."""
+        agent = cls()
+        agent.load_state(state)
+        agent.file_paths = state["file_paths"]
+        agent.index_keys = state["index_keys"]
+        agent.vectorstore = load_vectorstore(agent.index_keys)
+        if agent.vectorstore is None:
+            # Shards were evicted from the store, only then do we pay for embeddings again
+            logger.warning("Persisted index missing, rebuilding from files")
+            shards = get_or_build_shards(agent.file_paths)
+            agent.vectorstore = compose_vectorstore(list(shards.values()))
+            # Account for the shards that back the agent now, not the evicted ones
+            agent.index_keys = list(shards)
+        agent._account_index()
+        if agent.current_topic:
+            agent.tutor_chain = build_tutor(agent.vectorstore)
+        return agent
+
+    def _account_index(self):
+        # A single-file session uses the cached shard itself; a merged index belongs to the session
+        size = estimate_index_bytes(self.vectorstore)
+        if len(self.index_keys) == 1:
+            self.shared_index = {self.index_keys[0]: size}
+            self.index_bytes = 0
+        else:
+            self.shared_index = {}
+            self.index_bytes = size
+
+    def memory_bytes(self) -> int:
+        """Estimated memory owned by this agent: a merged index plus the transcript (see shared_index)."""
+        return self.index_bytes + sum(len(msg['content']) for msg in self.history)
+
     def generate_topics(self) -> list[str]:
         """Generate topics based on loaded documents."""
         if not self.vectorstore:
@@ -93,25 +177,24 @@ class StudentAgent:
         self.current_topic = topic
         self.questions_asked = 0
         self.history = []
+        self.history_window.reset()
         if self.vectorstore:
             self.tutor_chain = build_tutor(self.vectorstore)
         else:
             raise ValueError("Vectorstore not initialized. Upload files first.")
 
-    def chat(self, user_answer: str = None) -> dict:
-        """
-        Handle a chat turn.
-        If user_answer is None, it means we are starting or just want the next question.
-        """
-        finished = False
-        
+    def _record_answer(self, user_answer: str = None):
+        """Append the student's answer. Returns the 'finished' response once the target is reached."""
         if user_answer:
             self.history.append({"role": "user", "content": user_answer})
             self.questions_asked += 1
         
         if self.questions_asked >= self.target_questions:
+            self.precompute_evaluation()
             return {"finished": True, "message": "Great work! You've completed the session for this topic. Ready for evaluation?"}
+        return None
 
+    def _socratic_prompt(self) -> str:
         # Generate next question
         # We use the tutor chain which is a RetrievalQA. 
         # We need to craft the prompt carefully. The tutor.py prompt expects {context} and {question}.
@@ -131,9 +214,9 @@ class StudentAgent:
         docs = retriever.invoke(query_for_context)
         context = "\n".join([d.page_content for d in docs])
         
-        history_text = "\n".join([f"{msg['role']}: {msg['content']}" for msg in self.history])
+        history_text = self.history_window.render(self.history)
 
-        socratic_prompt = f"""
+        prompt = f"""
         You are a Socratic tutor teaching the topic: {self.current_topic}.
         Your goal is to verify the student's understanding by asking insightful questions one by one.
         Do NOT lecture. Ask a question that requires the student to explain the concept.
@@ -150,22 +233,52 @@ class StudentAgent:
         - Ensure the question is answered by the materials provided.
         - Return ONLY the question text.
         """
-        
-        response = self._invoke_with_retry(self.evaluator_llm, socratic_prompt)
-        next_question = response.content.strip()
-        
+        self.last_prompt_tokens = count_tokens(prompt)
+        return prompt
+
+    def _record_question(self, next_question: str) -> dict:
         self.history.append({"role": "assistant", "content": next_question})
+        # Summarize whatever left the verbatim window, off the critical path
+        self.history_window.compact(self.history)
         
         return {
             "finished": False,
-            "question": next_question
+            "question": next_question,
+            "prompt_tokens": self.last_prompt_tokens
         }
 
-    def evaluate(self) -> dict:
-        """Evaluate the entire session."""
+    def chat(self, user_answer: str = None) -> dict:
+        """
+        Handle a chat turn.
+        If user_answer is None, it means we are starting or just want the next question.
+        """
+        finished = self._record_answer(user_answer)
+        if finished:
+            return finished
+
+        response = self._invoke_with_retry(self.evaluator_llm, self._socratic_prompt())
+        return self._record_question(response.content.strip())
+
+    def chat_stream(self, user_answer: str = None):
+        """
+        Streaming variant of chat. Yields ("token", text) while the question is
+        generated, then ("done", response) once it has been added to the history.
+        """
+        finished = self._record_answer(user_answer)
+        if finished:
+            yield "done", finished
+            return
+
+        parts = []
+        for token in self._stream_with_retry(self.evaluator_llm, self._socratic_prompt()):
+            parts.append(token)
+            yield "token", token
+        yield "done", self._record_question("".join(parts).strip())
+
+    def _evaluation_prompt(self) -> str:
         history_text = "\n".join([f"{msg['role']}: {msg['content']}" for msg in self.history])
         
-        prompt = f"""
+        return f"""
         Review the following tutoring session transcript for the topic: {self.current_topic}.
         Evaluate the student's understanding.
         
@@ -177,10 +290,10 @@ class StudentAgent:
         - comments (General feedback)
         - details (Array of objects with "point" (what was good/bad) and "status" (correct/partial/wrong))
         """
-        
-        response = self._invoke_with_retry(self.evaluator_llm, prompt)
+
+    def _parse_evaluation(self, content: str) -> dict:
         try:
-            content = response.content.strip()
+            content = content.strip()
             if content.startswith("```json"):
                 content = content[7:-3]
             return json.loads(content)
@@ -191,3 +304,61 @@ class StudentAgent:
                 "comments": "Error generating evaluation.",
                 "details": []
             }
+
+    def _transcript_key(self) -> tuple:
+        return (self.current_topic, len(self.history), self.target_questions)
+
+    def _grade(self) -> dict:
+        response = self._invoke_with_retry(self.evaluator_llm, self._evaluation_prompt())
+        return self._parse_evaluation(response.content)
+
+    def precompute_evaluation(self):
+        """Start grading the finished transcript in the background, once per transcript."""
+        key = self._transcript_key()
+        if self._evaluation is None or self._evaluation[0] != key:
+            self._evaluation = (key, _evaluation_pool.submit(self._grade))
+
+    def extend_session(self, extra_questions: int = 3):
+        """Ask more questions; a precomputed evaluation no longer matches the transcript."""
+        self.target_questions += extra_questions
+        self._evaluation = None
+
+    def _precomputed_evaluation(self):
+        """Result of the background evaluation for the current transcript (waits if in flight), else None."""
+        if self._evaluation is None or self._evaluation[0] != self._transcript_key():
+            return None
+        try:
+            return self._evaluation[1].result()
+        except Exception as e:
+            logger.warning(f"Background evaluation failed, evaluating again: {e}")
+            self._evaluation = None
+            return None
+
+    def evaluate(self) -> dict:
+        """Evaluate the entire session."""
+        evaluation = self._precomputed_evaluation()
+        if evaluation is None:
+            evaluation = self._grade()
+            self._evaluation = (self._transcript_key(), _completed(evaluation))
+        return evaluation
+
+    def evaluate_stream(self):
+        """Streaming variant of evaluate: ("token", text) events, then ("done", evaluation)."""
+        evaluation = self._precomputed_evaluation()
+        if evaluation is not None:
+            yield "done", evaluation
+            return
+
+        parts = []
+        for token in self._stream_with_retry(self.evaluator_llm, self._evaluation_prompt()):
+            parts.append(token)
+            yield "token", token
+        evaluation = self._parse_evaluation("".join(parts))
+        self._evaluation = (self._transcript_key(), _completed(evaluation))
+        yield "done", evaluation
+
+
+def _completed(result) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
@@ -0,0 +1,102 @@
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from PIL import Image, ImageOps
+
+from agents.hashing import file_hash
+
+logger = logging.getLogger(__name__)
+
+# Fixed preview widths, requests are snapped to the nearest one that is at least as wide
+THUMBNAIL_WIDTHS = (320, 640, 1280)
+THUMBNAIL_QUALITY = 80
+
+# Disabled until the app tells us where to keep previews
+thumbnail_root = None
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="thumbnails")
+_inflight = {}  # content hash -> Future
+_lock = threading.Lock()
+
+
+def configure_thumbnails(root: str):
+    global thumbnail_root
+    thumbnail_root = root
+    os.makedirs(root, exist_ok=True)
+
+
+def pick_width(requested: int) -> int:
+    for width in THUMBNAIL_WIDTHS:
+        if width >= requested:
+            return width
+    return THUMBNAIL_WIDTHS[-1]
+
+
+def _path(digest: str, width: int) -> str:
+    return os.path.join(thumbnail_root, f"{digest}_{width}.webp")
+
+
+def _generate(path: str, digest: str):
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        for width in THUMBNAIL_WIDTHS:
+            target = _path(digest, width)
+            if os.path.exists(target):
+                continue
+            preview = image.copy()
+            # Never upscale, small originals are just re-encoded
+            preview.thumbnail((width, image.height))
+            tmp_path = f"{target}.tmp-{uuid.uuid4().hex[:8]}"
+            preview.save(tmp_path, "WEBP", quality=THUMBNAIL_QUALITY)
+            os.replace(tmp_path, target)
+    logger.info(f"Generated previews for {os.path.basename(path)}")
+
+
+def schedule(path: str):
+    """Generate all preview widths for an image in the background. Returns the Future."""
+    if thumbnail_root is None:
+        return None
+    digest = file_hash(path)
+    with _lock:
+        future = _inflight.get(digest)
+        if future is not None:
+            return future
+        future = _executor.submit(_generate, path, digest)
+        _inflight[digest] = future
+    # Outside the lock: an already finished future runs the callback right here
+    future.add_done_callback(lambda _: _forget(digest, future))
+    return future
+
+
+def _forget(digest: str, future):
+    with _lock:
+        if _inflight.get(digest) is future:
+            del _inflight[digest]
+
+
+def get_thumbnail(path: str, width: int, timeout: float = 2.0):
+    """
+    Path of the cached WebP preview closest to width. If it does not exist yet,
+    generation is scheduled off the request thread and awaited for at most
+    timeout seconds; None means the caller should serve the original for now.
+    """
+    if thumbnail_root is None:
+        return None
+    target = _path(file_hash(path), pick_width(width))
+    if os.path.exists(target):
+        return target
+
+    future = schedule(path)
+    try:
+        future.result(timeout=timeout)
+    except TimeoutError:
+        return None
+    except Exception as e:
+        logger.warning(f"Preview generation failed for {path}: {e}")
+        return None
+    return target if os.path.exists(target) else None
@@ -1,13 +1,10 @@
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
+from agents.clients import get_chat_model
 
 def build_tutor(vectorstore):
-    llm = ChatOpenAI(
-        model="gpt-4.1",
-        temperature=0.2
-    )
+    llm = get_chat_model("gpt-4.1", 0.2, "tutor")
 
     prompt = PromptTemplate(
         input_variables=["context", "question"],
@@ -1,27 +1,303 @@
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
-from agents.loaders import load_file
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from agents.loaders import iter_documents, load_files
+from agents.index_store import IndexStore
+from agents.hashing import file_hash, text_hash
+from agents.embedder import embed_texts
+from agents import clients
+from collections import OrderedDict
+import faiss
+import hashlib
+import logging
+import threading
+import time
 import os
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+EMBEDDING_MODEL = "text-embedding-3-large"
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 150
+# Bump when loaders change how files are turned into chunks, stored shards are then rebuilt
+LOADER_VERSION = "2"
+# Documents (PDF pages) split and embedded per step while a file streams in
+EMBED_DOCUMENT_BATCH = int(os.getenv("EMBED_DOCUMENT_BATCH", "16"))
 
-def build_vectorstore(file_paths: list[str]):
-    docs = []
+# Upper bound for the process-wide index cache (vectors + chunk text)
+VECTORSTORE_CACHE_MAX_BYTES = int(os.getenv("VECTORSTORE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# On-disk index store limits, see configure_index_store
+INDEX_STORE_MAX_BYTES = int(os.getenv("INDEX_STORE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+INDEX_STORE_MAX_IDLE_DAYS = float(os.getenv("INDEX_STORE_MAX_IDLE_DAYS", "14"))
+
+logger = logging.getLogger(__name__)
 
+
+def index_key(file_paths: list[str]) -> str:
+    """Cache key for an index: file contents + embedding model + splitter settings."""
+    h = hashlib.sha256()
+    h.update(f"{EMBEDDING_MODEL}|{CHUNK_SIZE}|{CHUNK_OVERLAP}|{LOADER_VERSION}".encode())
     for path in file_paths:
-        docs.extend(load_file(path))
+        # Extension matters too, it decides which loader is used
+        h.update(f"|{os.path.splitext(path)[1].lower()}:{file_hash(path)}".encode())
+    return h.hexdigest()
+
+
+def estimate_index_bytes(vectorstore) -> int:
+    """Rough memory footprint of a FAISS vectorstore: float32 vectors plus chunk text."""
+    if vectorstore is None:
+        return 0
+    index = vectorstore.index
+    size = index.ntotal * index.d * 4
+    for doc in getattr(vectorstore.docstore, "_dict", {}).values():
+        size += len(doc.page_content.encode("utf-8"))
+    return size
+
+
+class VectorstoreCache:
+    """LRU cache of built FAISS indexes, bounded by estimated memory."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (vectorstore, size)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, vectorstore):
+        size = estimate_index_bytes(vectorstore)
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                # Would evict everything else and still not fit
+                return
+            self._entries[key] = (vectorstore, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+vectorstore_cache = VectorstoreCache(VECTORSTORE_CACHE_MAX_BYTES)
+
+# Disabled until the app tells us where to keep indexes
+index_store = None
+
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+
+def _build_lock(key: str):
+    with _build_locks_guard:
+        return _build_locks.setdefault(key, threading.Lock())
+
+
+def configure_index_store(root: str):
+    """Persist built indexes under root so restarts and other workers can reuse them."""
+    global index_store
+    index_store = IndexStore(root, INDEX_STORE_MAX_BYTES, INDEX_STORE_MAX_IDLE_DAYS)
+    index_store.cleanup()
+    return index_store
+
+
+def get_embeddings():
+    return clients.get_embeddings(EMBEDDING_MODEL)
+
 
+def load_shard(key: str):
+    """Shard from the in-memory cache or the on-disk store, None if it was never built."""
+    shard = vectorstore_cache.get(key)
+    if shard is not None:
+        return shard
+
+    if index_store is not None:
+        shard = index_store.load(key, get_embeddings())
+        if shard is not None:
+            logger.info(f"Loaded persisted shard {key[:12]}")
+            vectorstore_cache.put(key, shard)
+    return shard
+
+
+def _batches(documents, size: int):
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_shard(path: str, documents=None):
+    """
+    Index a single file (or its already loaded documents, possibly a lazy
+    iterator). Documents are split and embedded in batches as they arrive, so
+    only one batch of a long PDF is held as text at a time. Returns None when
+    there is no text.
+    """
     splitter = RecursiveCharacterTextSplitter(
-        chunk_size=800,
-        chunk_overlap=150
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
     )
 
-    chunks = splitter.split_documents(docs)
+    if documents is None:
+        documents = iter_documents(path, CHUNK_SIZE)
+    embeddings = get_embeddings()
+    shard = None
+    positions = {}  # chunk text hash -> row in the shard, repeated chunks reuse that vector
+
+    def lookup(digest):
+        position = positions.get(digest)
+        return shard.index.reconstruct(position).tolist() if position is not None else None
+
+    for batch in _batches(documents, EMBED_DOCUMENT_BATCH):
+        chunks = splitter.split_documents(batch)
+        if not chunks:
+            continue
+        texts = [chunk.page_content for chunk in chunks]
+        vectors = embed_texts(embeddings, texts, lookup)
+        offset = shard.index.ntotal if shard is not None else 0
+        for i, text in enumerate(texts):
+            positions.setdefault(text_hash(text), offset + i)
+
+        text_embeddings = list(zip(texts, vectors))
+        metadatas = [chunk.metadata for chunk in chunks]
+        if shard is None:
+            shard = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas)
+        else:
+            shard.add_embeddings(text_embeddings, metadatas=metadatas)
+    return shard
+
+
+def get_or_build_shard(path: str, key: str = None, documents: list = None):
+    """Per-file index, looked up in memory, then on disk, then built and persisted."""
+    key = key or index_key([path])
+    shard = load_shard(key)
+    if shard is not None:
+        return shard
+
+    # One build per key: a request arriving while background ingestion embeds
+    # the same file waits for it instead of paying for the embeddings twice
+    with _build_lock(key):
+        shard = load_shard(key)
+        if shard is not None:
+            return shard
+
+        logger.info(f"Embedding {os.path.basename(path)}")
+        shard = build_shard(path, documents)
+        if shard is None:
+            return None
+        vectorstore_cache.put(key, shard)
+        if index_store is not None:
+            index_store.save(key, shard, {
+                "model": EMBEDDING_MODEL,
+                "chunk_size": CHUNK_SIZE,
+                "chunk_overlap": CHUNK_OVERLAP,
+                "files": [{"name": os.path.basename(path), "sha256": file_hash(path)}],
+            })
+        return shard
 
-    embeddings = OpenAIEmbeddings(
-        model="text-embedding-3-large",
-        api_key=OPENAI_API_KEY
+
+def compose_vectorstore(shards: list):
+    """
+    Merge per-file shards into one index for a session. Flat indexes make this
+    a copy of the vectors, and similarity search over the result is the exact
+    top-k across all shards. The shards are shared with the cache and other
+    sessions, so vectors and documents are copied out of them, never moved
+    (FAISS.merge_from would empty the source index).
+    """
+    shards = [shard for shard in shards if shard is not None]
+    if not shards:
+        raise ValueError("No text could be extracted from the provided files.")
+    if len(shards) == 1:
+        return shards[0]
+
+    index = faiss.IndexFlatL2(shards[0].index.d)
+    documents = {}
+    index_to_docstore_id = {}
+    for shard in shards:
+        offset = index.ntotal
+        index.add(shard.index.reconstruct_n(0, shard.index.ntotal))
+        for position, doc_id in shard.index_to_docstore_id.items():
+            index_to_docstore_id[offset + position] = doc_id
+            documents[doc_id] = shard.docstore.search(doc_id)
+    return FAISS(
+        embedding_function=shards[0].embedding_function,
+        index=index,
+        docstore=InMemoryDocstore(documents),
+        index_to_docstore_id=index_to_docstore_id,
     )
 
-    return FAISS.from_documents(chunks, embeddings)
+
+def build_vectorstore(file_paths: list[str]):
+    return compose_vectorstore([build_shard(path, documents) for path, documents, _ in load_files(file_paths, CHUNK_SIZE)])
+
+
+def get_or_build_shards(file_paths: list[str], timings: dict = None) -> dict:
+    """
+    Non-empty shards for the files, in file order, keyed by shard key. Files
+    without a stored shard are parsed in parallel and embedded one by one as
+    their text becomes available. If timings is given it is filled with
+    path -> {"load_seconds", "embed_seconds", "cached"}.
+    """
+    keys = {path: index_key([path]) for path in file_paths}
+    found = {path: load_shard(keys[path]) for path in file_paths}
+    missing = [path for path in file_paths if found[path] is None]
+
+    for path, documents, load_seconds in load_files(missing, CHUNK_SIZE):
+        started = time.perf_counter()
+        found[path] = get_or_build_shard(path, keys[path], documents)
+        if timings is not None:
+            timings[path] = {"load_seconds": round(load_seconds, 3),
+                             "embed_seconds": round(time.perf_counter() - started, 3), "cached": False}
+    if timings is not None:
+        for path in file_paths:
+            timings.setdefault(path, {"load_seconds": 0.0, "embed_seconds": 0.0, "cached": True})
+
+    return {keys[path]: found[path] for path in file_paths if found[path] is not None}
+
+
+def get_or_build_vectorstore(file_paths: list[str]):
+    """Compose a session index from cached per-file shards, embedding only new files."""
+    return compose_vectorstore(list(get_or_build_shards(file_paths).values()))
+
+
+def load_vectorstore(index_keys: list[str]):
+    """Rebuild a session index from already persisted shards. None if any is gone."""
+    shards = []
+    for key in index_keys:
+        shard = load_shard(key)
+        if shard is None:
+            return None
+        shards.append(shard)
+    return compose_vectorstore(shards)
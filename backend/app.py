@@ -1,14 +1,12 @@
 import os
 import sys
 import logging
-import base64
 import time
 import json
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, send_file, send_from_directory, url_for
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
-from openai import OpenAI
 
 load_dotenv()
 
@@ -16,6 +14,13 @@ load_dotenv()
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from agents.student import StudentAgent
+from agents import vectorstore, extraction, embedder, embedding_cache, notes_analysis, ocr, thumbnails, clients
+from agents.extraction import extract_text
+from agents.catalog import UploadCatalog
+from agents.ingestion import IngestionQueue
+from agents.llm_executor import llm_executor, embedding_executor
+from agents.blob_store import store_upload, release_blob
+from agents.sessions import SessionRegistry, MemorySessionBackend, SQLiteSessionBackend
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO)
@@ -24,22 +29,88 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
-# Use the main project uploads folder (one level up from backend)
-UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
-if not os.path.exists(UPLOAD_FOLDER):
-    UPLOAD_FOLDER = 'uploads'  # Fallback to local folder
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Loader worker processes are started with spawn, which imports this file again as
+# __mp_main__. Startup (folders, caches, SQLite, queues) must only run in the app itself;
+# the workers run agents.loader_worker and need none of it.
+if __name__ != '__mp_main__':
+    # Use the main project uploads folder (one level up from backend), UPLOAD_FOLDER overrides it
+    UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER')
+    if not UPLOAD_FOLDER:
+        UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
+        if not os.path.exists(UPLOAD_FOLDER):
+            UPLOAD_FOLDER = 'uploads'  # Fallback to local folder
+    # Absolute, send_file/send_from_directory resolve relative paths against app.root_path, not the cwd
+    UPLOAD_FOLDER = os.path.abspath(UPLOAD_FOLDER)
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
-# In-memory storage for session data
-# Map session_id -> StudentAgent instance
-active_agents = {}
+    # Derived data (indexes, caches) lives in a hidden folder inside uploads
+    CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, '.cache')
+    vectorstore.configure_index_store(os.path.join(CACHE_FOLDER, 'indexes'))
+    extraction.configure_extraction_cache(os.path.join(CACHE_FOLDER, 'text'))
+    ocr.configure_ocr_cache(os.path.join(CACHE_FOLDER, 'ocr'))
+    # EMBEDDING_CACHE_PATH (shared with the parser service) takes precedence over this default
+    embedding_cache.configure_embedding_cache(os.path.join(CACHE_FOLDER, 'embeddings.sqlite3'))
+    notes_analysis.configure_analysis_cache(os.path.join(CACHE_FOLDER, 'analysis'))
+    thumbnails.configure_thumbnails(os.path.join(CACHE_FOLDER, 'thumbnails'))
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    # Catalog of uploads, rebuilt from the folder on a cold start
+    upload_catalog = UploadCatalog(os.path.join(CACHE_FOLDER, 'catalog.sqlite3'))
+    if upload_catalog.count() == 0:
+        upload_catalog.rebuild(UPLOAD_FOLDER)
+
+    # Extraction + embedding starts at upload time, /api/topics then mostly reuses the shards
+    ingestion_queue = IngestionQueue(
+        max_workers=int(os.getenv('INGESTION_WORKERS', '2')),
+        on_status=upload_catalog.set_status
+    )
+
+    # In-memory storage for session data
+    # Map session_id -> StudentAgent instance, bounded by count, bytes and idle time
+    active_agents = SessionRegistry(
+        max_sessions=int(os.getenv('MAX_SESSIONS', '200')),
+        max_bytes=int(os.getenv('SESSIONS_MAX_BYTES', str(1024 * 1024 * 1024))),
+        idle_ttl=float(os.getenv('SESSION_IDLE_TTL_SECONDS', '3600'))
+    )
+
+    # Serialized session state shared between workers; active_agents is a local cache in front of it
+    if os.getenv('SESSION_BACKEND', 'sqlite') == 'memory':
+        session_backend = MemorySessionBackend()
+    else:
+        session_backend = SQLiteSessionBackend(
+            os.path.join(CACHE_FOLDER, 'sessions.sqlite3'),
+            ttl=float(os.getenv('SESSION_STATE_TTL_SECONDS', str(24 * 3600)))
+        )
+
+def get_agent(session_id):
+    """Agent for a session, rehydrated from the shared backend if another worker changed it."""
+    state = session_backend.load(session_id)
+    if state is None:
+        active_agents.pop(session_id)
+        return None
+    agent = active_agents.get(session_id)
+    if agent is None:
+        agent = StudentAgent.from_state(state)
+        active_agents.put(session_id, agent)
+    elif agent.state_version != state['version']:
+        agent.load_state(state)
+    return agent
+
+def save_agent(session_id, agent):
+    agent.state_version = session_backend.save(session_id, agent.to_state())
+
+# Initialize OpenAI client (shares the process-wide connection pool)
+client = clients.get_openai_client()
 
 # Image extensions
 IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'webp', 'bmp'}
+# Width of the image previews returned by /api/notes
+PREVIEW_WIDTH = 1280
+
+def list_upload_files():
+    """Names of the uploaded files, skipping the hidden cache folder."""
+    folder = app.config['UPLOAD_FOLDER']
+    return [f for f in os.listdir(folder) if not f.startswith('.') and os.path.isfile(os.path.join(folder, f))]
 
 @app.route('/api/notes', methods=['POST'])
 def get_notes():
@@ -62,53 +133,23 @@ def get_notes():
         content = ''
         
         # Handle image files
+        # Images are not inlined, content is the URL of a downscaled preview
         if file_ext in IMAGE_EXTENSIONS:
-            with open(filepath, 'rb') as f:
-                image_data = base64.b64encode(f.read()).decode('utf-8')
-            mime_type = f'image/{file_ext}'
-            if file_ext == 'jpg':
-                mime_type = 'image/jpeg'
-            content = f'data:{mime_type};base64,{image_data}'
+            content = url_for('get_note_file', filename=filename, width=PREVIEW_WIDTH, _external=True)
             return jsonify({
                 'filename': filename,
                 'content': content,
+                'original_url': url_for('get_note_file', filename=filename, _external=True),
                 'format': 'image'
             }), 200
         
-        elif file_ext == 'txt':
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-        
-        elif file_ext == 'csv':
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-        
-        elif file_ext == 'docx':
-            try:
-                from docx import Document
-                doc = Document(filepath)
-                content = '\n'.join([para.text for para in doc.paragraphs])
-            except ImportError:
-                return jsonify({'error': 'python-docx not installed'}), 500
-        
-        elif file_ext == 'pdf':
-            try:
-                from PyPDF2 import PdfReader
-                reader = PdfReader(filepath)
-                text_parts = []
-                for page in reader.pages:
-                    text_parts.append(page.extract_text() or '')
-                content = '\n'.join(text_parts)
-            except ImportError:
-                return jsonify({'error': 'PyPDF2 not installed'}), 500
-        
-        else:
-            # Try to read as text for unknown formats
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            except:
-                return jsonify({'error': 'Unsupported file format'}), 400
+        # Text, CSV, DOCX, PDF and unknown formats go through the shared extraction cache
+        try:
+            content = extract_text(filepath)
+        except ValueError as e:
+            upload_catalog.set_status(filename, 'failed')
+            return jsonify({'error': str(e)}), 400
+        upload_catalog.set_status(filename, 'done')
         
         return jsonify({
             'filename': filename,
@@ -119,6 +160,26 @@ def get_notes():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/notes/file/<path:filename>', methods=['GET'])
+def get_note_file(filename):
+    """Raw uploaded file, streamed from disk with Content-Length, ETag/304 and Range support"""
+    # Only flat names of recorded uploads: '..' or hidden parts would reach the .cache folder
+    if secure_filename(filename) != filename or upload_catalog.get(filename) is None:
+        return jsonify({'error': 'File not found'}), 404
+
+    # ?width= serves a cached WebP preview (original until it has been generated)
+    width = request.args.get('width', type=int)
+    file_ext = os.path.splitext(filename)[1].lower().lstrip('.')
+    if width and file_ext in IMAGE_EXTENSIONS:
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        if not os.path.isfile(filepath):
+            return jsonify({'error': 'File not found'}), 404
+        preview = thumbnails.get_thumbnail(filepath, width)
+        if preview:
+            return send_file(preview, mimetype='image/webp', conditional=True, etag=True, max_age=3600)
+
+    return send_from_directory(app.config['UPLOAD_FOLDER'], filename, conditional=True, etag=True, max_age=3600)
+
 @app.route('/api/notes/analyze', methods=['POST'])
 def analyze_notes():
     """Analyze notes and return highlighted content with summary"""
@@ -137,96 +198,48 @@ def analyze_notes():
     
     # Get the text content
     try:
-        content = ''
-        if file_ext == 'txt':
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-        elif file_ext == 'docx':
-            from docx import Document
-            doc = Document(filepath)
-            content = '\n'.join([para.text for para in doc.paragraphs])
-        elif file_ext == 'pdf':
-             return jsonify({'error': 'PDF files are not supported. Please convert to DOCX or TXT.'}), 400
-
-        else:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
+        content = extract_text(filepath)
+        upload_catalog.set_status(filename, 'done')
     except Exception as e:
         return jsonify({'error': f'Failed to read file: {str(e)}'}), 500
     
     if not content.strip():
         return jsonify({'error': 'File is empty'}), 400
     
+    render = data.get('render', notes_analysis.DEFAULT_RENDER)
+    if render not in notes_analysis.ANALYZERS:
+        return jsonify({'error': f'Unknown render mode: {render}'}), 400
+    analyze = notes_analysis.ANALYZERS[render]
+    
     # Call OpenAI to analyze and highlight
+    # render=annotations: the model lists highlight phrases and we build the HTML
+    # Long notes (or mode=segmented) are split on paragraphs and analyzed concurrently
+    # Results are cached on disk by note content, model and prompt version
     try:
-        # Truncate content if too long to avoid token limits
-        max_content_length = 15000
-        truncated_content = content[:max_content_length] if len(content) > max_content_length else content
-        
-        prompt = f"""Analyze the following study notes. Return a JSON object with:
-1. "summary": A concise summary (3-5 sentences) of the key points.
-2. "highlighted_html": The text with HTML spans for highlighting:
-   - <span class="highlight-definition">text</span> for definitions
-   - <span class="highlight-concept">text</span> for key concepts
-   - <span class="highlight-important">text</span> for important notes
-   - <span class="highlight-example">text</span> for examples
-
-IMPORTANT: Return ONLY valid JSON, no markdown, no code blocks. Escape all quotes and special characters properly.
-
-Notes to analyze:
-
-{truncated_content}"""
-
-        response = client.chat.completions.create(
-            model="gpt-4.1",
-            messages=[
-                {"role": "system", "content": "You are a study assistant. Return ONLY valid JSON with 'summary' and 'highlighted_html' keys. No markdown code blocks. Properly escape all special characters in JSON strings."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=16000
-        )
-        
-        result_text = response.choices[0].message.content.strip()
-        
-        # Remove markdown code blocks if present
-        if result_text.startswith('```'):
-            lines = result_text.split('\n')
-            # Remove first line (```json) and last line (```)
-            lines = [l for l in lines if not l.strip().startswith('```')]
-            result_text = '\n'.join(lines)
-        
-        # Try to find JSON object in response
-        start_idx = result_text.find('{')
-        end_idx = result_text.rfind('}')
-        
-        if start_idx != -1 and end_idx != -1:
-            result_text = result_text[start_idx:end_idx + 1]
-        
-        try:
-            result = json.loads(result_text)
-        except json.JSONDecodeError:
-            # Fallback: try to fix common issues
-            import re
-            # Replace unescaped newlines in strings
-            result_text = re.sub(r'(?<!\\)\n', '\\n', result_text)
-            try:
-                result = json.loads(result_text)
-            except:
-                # Last resort: return original content with basic highlighting
-                return jsonify({
-                    'filename': filename,
-                    'summary': 'Summary generation failed - displaying original content.',
-                    'highlighted_html': f'<p>{content}</p>',
-                    'format': file_ext
-                }), 200
+        started = time.perf_counter()
+        segmented = data.get('mode') == 'segmented' or len(content) > notes_analysis.SEGMENT_MAX_CHARS
+        cache_key = notes_analysis.analysis_cache_key(content, render, segmented)
+        result = notes_analysis.get_cached_analysis(cache_key)
+        cached = result is not None
+        if not cached:
+            if segmented:
+                result = notes_analysis.analyze_segmented(client, content, analyze_segment=analyze)
+            else:
+                result = analyze(client, content)
+            notes_analysis.cache_analysis(cache_key, result)
         
-        return jsonify({
+        response = {
             'filename': filename,
-            'summary': result.get('summary', ''),
-            'highlighted_html': result.get('highlighted_html', content),
-            'format': file_ext
-        }), 200
+            'summary': result['summary'],
+            'highlighted_html': result['highlighted_html'],
+            'format': file_ext,
+            'cached': cached,
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+        for key in ('segments', 'annotations'):
+            if key in result:
+                response[key] = result[key]
+        return jsonify(response), 200
         
     except json.JSONDecodeError as e:
         return jsonify({'error': f'Failed to parse AI response: {str(e)}'}), 500
@@ -235,22 +248,33 @@ Notes to analyze:
 
 @app.route('/api/notes/list', methods=['GET'])
 def list_notes():
-    """List all uploaded files in the uploads folder"""
+    """
+    List uploaded files from the catalog, filtered by ?format=. Paginated when
+    ?cursor= or ?limit= is given, otherwise every file is returned as before.
+    """
     try:
-        files = []
-        for filename in os.listdir(app.config['UPLOAD_FOLDER']):
-            # Skip PDF files
-            if filename.lower().endswith('.pdf'):
-                continue
-                
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            if os.path.isfile(filepath):
-                files.append({
-                    'filename': filename,
-                    'format': os.path.splitext(filename)[1].lower().lstrip('.'),
-                    'size': os.path.getsize(filepath)
-                })
-        return jsonify({'files': files}), 200
+        fmt = request.args.get('format')
+        if 'limit' in request.args or 'cursor' in request.args:
+            limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+            files, next_cursor = upload_catalog.list(cursor=request.args.get('cursor'), limit=limit, fmt=fmt)
+        else:
+            files, next_cursor = [], None
+            while True:
+                page, next_cursor = upload_catalog.list(cursor=next_cursor, limit=1000, fmt=fmt)
+                files.extend(page)
+                if next_cursor is None:
+                    break
+        return jsonify({
+            'files': [{
+                'filename': f['filename'],
+                'format': f['format'],
+                'size': f['size'],
+                'content_hash': f['content_hash'],
+                'uploaded_at': f['uploaded_at'],
+                'extraction_status': f['extraction_status']
+            } for f in files],
+            'next_cursor': next_cursor
+        }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -264,15 +288,29 @@ def upload_file():
         return jsonify({'error': 'No selected file'}), 400
     
     saved_filenames = []
+    deduplicated = []
     filepaths = []
     
     for file in files:
         if file:
             filename = secure_filename(file.filename)
             filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
+            # Stored once per content hash; identical re-uploads write nothing, and since
+            # every downstream cache is keyed by content they skip all processing too
+            previous = upload_catalog.get(filename)
+            content_hash, size, duplicate = store_upload(file.stream, app.config['UPLOAD_FOLDER'], filename)
             saved_filenames.append(filename)
             filepaths.append(filepath)
+            if duplicate:
+                deduplicated.append(filename)
+                if previous:
+                    continue
+            upload_catalog.record(filename, size, content_hash)
+            if previous and previous['content_hash'] != content_hash:
+                release_blob(app.config['UPLOAD_FOLDER'], previous['content_hash'])
+            if os.path.splitext(filename)[1].lower().lstrip('.') in IMAGE_EXTENSIONS:
+                thumbnails.schedule(filepath)
+            ingestion_queue.submit(filename, filepath, content_hash)
             
     # For Hackathon simplicity, we might just have one global "user" context or temporary sessions.
     # But let's assume we initialize an agent per session later.
@@ -295,7 +333,19 @@ def upload_file():
     # The mock used `request.json` but commented out `filename = data.get('filename')`.
     # Let's assume the frontend sends the list of filenames it just uploaded.
     
-    return jsonify({'message': 'Files uploaded successfully', 'filenames': saved_filenames}), 200
+    return jsonify({'message': 'Files uploaded successfully', 'filenames': saved_filenames, 'deduplicated': deduplicated}), 200
+
+@app.route('/api/upload/status/<path:filename>', methods=['GET'])
+def upload_status(filename):
+    """Background ingestion status of an uploaded file"""
+    status = ingestion_queue.status(filename)
+    if status is None:
+        # Ingested by another worker or before a restart, the catalog still knows
+        entry = upload_catalog.get(filename)
+        if entry is None:
+            return jsonify({'error': 'File not found'}), 404
+        status = {'status': entry['extraction_status'], 'error': None, 'seconds': None}
+    return jsonify({'filename': filename, **status}), 200
 
 @app.route('/api/topics', methods=['POST'])
 def get_topics():
@@ -306,7 +356,7 @@ def get_topics():
     
     if not filenames:
         # Fallback: list all in uploads
-        filenames = os.listdir(app.config['UPLOAD_FOLDER'])
+        filenames = list_upload_files()
     
     file_paths = [os.path.join(app.config['UPLOAD_FOLDER'], f) for f in filenames if os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], f))]
     
@@ -314,8 +364,10 @@ def get_topics():
         return jsonify({'error': 'No files found'}), 400
 
     # Create a temporary agent to generate topics
-    # Note: This is expensive to rebuild vectorstore just for topics, but safe.
+    # The vectorstore is cached by file contents, so start_session reuses it.
+    # Shards embedded in the background since upload are reused once those jobs finish.
     try:
+        ingestion_queue.wait([os.path.basename(p) for p in file_paths])
         temp_agent = StudentAgent()
         temp_agent.process_files(file_paths)
         topics = temp_agent.generate_topics()
@@ -331,7 +383,7 @@ def start_session():
     filenames = data.get('filenames', []) # List of filenames
     
     if not filenames:
-         filenames = os.listdir(app.config['UPLOAD_FOLDER'])
+         filenames = list_upload_files()
          
     file_paths = [os.path.join(app.config['UPLOAD_FOLDER'], f) for f in filenames]
     
@@ -339,9 +391,11 @@ def start_session():
     
     agent = StudentAgent()
     try:
+        ingestion_queue.wait(filenames)
         agent.process_files(file_paths)
         agent.start_learning(topic)
-        active_agents[session_id] = agent
+        save_agent(session_id, agent)
+        active_agents.put(session_id, agent)
         return jsonify({'session_id': session_id}), 200
     except Exception as e:
          logger.error(f"Error starting session: {e}")
@@ -352,11 +406,11 @@ def continue_session():
     data = request.json
     session_id = data.get('session_id')
     
-    if session_id not in active_agents:
+    agent = get_agent(session_id)
+    if agent is None:
         return jsonify({'error': 'Session not found'}), 404
-        
-    agent = active_agents[session_id]
-    agent.target_questions += 3
+    agent.extend_session(3)
+    save_agent(session_id, agent)
     return jsonify({'message': 'Session extended'}), 200
 
 @app.route('/api/chat', methods=['POST'])
@@ -365,13 +419,13 @@ def chat():
     session_id = data.get('session_id')
     user_answer = data.get('answer') # Can be None if it's the start
     
-    if session_id not in active_agents:
+    agent = get_agent(session_id)
+    if agent is None:
         return jsonify({'error': 'Session not found'}), 404
     
-    agent = active_agents[session_id]
-    
     try:
         response = agent.chat(user_answer)
+        save_agent(session_id, agent)
         return jsonify(response), 200
     except Exception as e:
         logger.error(f"Error in chat: {e}")
@@ -382,11 +436,10 @@ def evaluate():
     data = request.json
     session_id = data.get('session_id')
     
-    if session_id not in active_agents:
+    agent = get_agent(session_id)
+    if agent is None:
         return jsonify({'error': 'Session not found'}), 404
     
-    agent = active_agents[session_id]
-    
     try:
         evaluation = agent.evaluate()
         return jsonify(evaluation), 200
@@ -394,9 +447,76 @@ def evaluate():
         logger.error(f"Error in evaluation: {e}")
         return jsonify({'error': str(e)}), 500
 
+def sse_response(events, on_done=None):
+    """Wrap (event, data) pairs from a generator as a Server-Sent Events response."""
+    def generate():
+        try:
+            for event, payload in events:
+                if event == 'done' and on_done:
+                    on_done()
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            logger.error(f"Error while streaming: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Same as /api/chat, but the question is streamed as SSE 'token' events followed by 'done'."""
+    data = request.json
+    session_id = data.get('session_id')
+    user_answer = data.get('answer')
+
+    agent = get_agent(session_id)
+    if agent is None:
+        return jsonify({'error': 'Session not found'}), 404
+
+    return sse_response(agent.chat_stream(user_answer), on_done=lambda: save_agent(session_id, agent))
+
+@app.route('/api/evaluate/stream', methods=['POST'])
+def evaluate_stream():
+    data = request.json
+    session_id = data.get('session_id')
+
+    agent = get_agent(session_id)
+    if agent is None:
+        return jsonify({'error': 'Session not found'}), 404
+
+    return sse_response(agent.evaluate_stream())
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        'vectorstores': vectorstore.vectorstore_cache.stats(),
+        'index_store': vectorstore.index_store.stats() if vectorstore.index_store else None,
+        'embeddings': embedder.embedding_stats.stats(),
+        'embedding_cache': embedding_cache.embedding_cache.stats() if embedding_cache.embedding_cache else None,
+        'extracted_text': extraction.extraction_cache.stats() if extraction.extraction_cache else None,
+        'ocr': ocr.stats(),
+        'analysis': notes_analysis.analysis_cache.stats() if notes_analysis.analysis_cache else None
+    }), 200
+
+@app.route('/api/clients/stats', methods=['GET'])
+def client_stats():
+    return jsonify(clients.stats()), 200
+
+@app.route('/api/llm/stats', methods=['GET'])
+def llm_stats():
+    return jsonify({**llm_executor.stats(), 'embeddings': embedding_executor.stats()}), 200
+
+@app.route('/api/sessions/stats', methods=['GET'])
+def session_stats():
+    return jsonify(active_agents.stats()), 200
+
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({'status': 'ok'}), 200
 
+# Keep this guard: spawned loader workers import this file, they must not start a server
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def backend_app(tmp_path_factory):
+    """backend.app started against a temporary uploads folder, so tests never touch the work tree."""
+    pytest.importorskip("flask")
+    pytest.importorskip("langchain_core")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("UPLOAD_FOLDER", str(tmp_path_factory.mktemp("uploads")))
+        mp.setenv("SESSION_BACKEND", "memory")
+        mp.setenv("OPENAI_API_KEY", "test-key")
+        mp.delenv("EMBEDDING_CACHE_PATH", raising=False)
+        from backend import app as backend_app
+    backend_app.app.config["TESTING"] = True
+    return backend_app
@@ -0,0 +1,45 @@
+import io
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import blob_store
+from agents.blob_store import OBJECTS_DIR, release_blob, store_upload
+
+
+def blobs(folder):
+    return [name for _, _, names in os.walk(os.path.join(folder, OBJECTS_DIR)) for name in names]
+
+
+def test_identical_uploads_share_one_blob(tmp_path):
+    digest, size, duplicate = store_upload(io.BytesIO(b"notes"), str(tmp_path), "a.txt")
+    assert (size, duplicate) == (5, False)
+    assert store_upload(io.BytesIO(b"notes"), str(tmp_path), "b.txt")[0] == digest
+    assert store_upload(io.BytesIO(b"notes"), str(tmp_path), "a.txt")[2] is True
+    assert blobs(tmp_path) == [digest]
+    assert os.path.samefile(tmp_path / "a.txt", tmp_path / "b.txt")
+
+
+def test_legacy_file_leaves_no_unreferenced_blob(tmp_path):
+    (tmp_path / "old.txt").write_bytes(b"saved before the blob store")
+
+    _, _, duplicate = store_upload(io.BytesIO(b"saved before the blob store"), str(tmp_path), "old.txt")
+
+    assert duplicate is True
+    assert blobs(tmp_path) == []
+
+
+def test_without_hard_links_no_blob_is_kept(tmp_path, monkeypatch):
+    def no_link(src, dst):
+        raise OSError("hard links not supported")
+    monkeypatch.setattr(blob_store.os, "link", no_link)
+
+    digest, _, _ = store_upload(io.BytesIO(b"first"), str(tmp_path), "a.txt")
+    assert (tmp_path / "a.txt").read_bytes() == b"first"
+    assert blobs(tmp_path) == []
+
+    store_upload(io.BytesIO(b"second"), str(tmp_path), "a.txt")
+    release_blob(str(tmp_path), digest)
+    assert (tmp_path / "a.txt").read_bytes() == b"second"
+    assert blobs(tmp_path) == []
@@ -0,0 +1,166 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.llm_executor import CircuitBreaker, CircuitOpenError, LLMExecutor
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeAPIError(Exception):
+    """Shaped like the OpenAI SDK's APIStatusError: status_code plus the HTTP response."""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = FakeResponse(status_code, headers)
+
+
+class FakeProvider:
+    """Raises the queued errors in order, then answers 'ok'."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+class FakeChunk:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeStreamingLLM:
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    def stream(self, prompt):
+        for token in self.tokens:
+            yield FakeChunk(token)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_executor(threshold=3, cooldown=30.0, max_retries=3):
+    clock = Clock()
+    sleeps = []
+    executor = LLMExecutor(
+        rpm=1000, tpm=1_000_000, max_retries=max_retries, backoff_base=0.5, backoff_max=30,
+        breaker=CircuitBreaker(threshold, cooldown, clock=clock), sleep=sleeps.append,
+    )
+    return executor, clock, sleeps
+
+
+def test_retries_429_with_backoff():
+    executor, _, sleeps = make_executor()
+    provider = FakeProvider(FakeAPIError(429), FakeAPIError(429))
+
+    assert executor.execute(provider) == "ok"
+    assert provider.calls == 3
+    assert len(sleeps) == 2
+    # Full jitter: uniform in [0, base * 2^attempt]
+    assert 0 <= sleeps[0] <= 0.5 and 0 <= sleeps[1] <= 1.0
+    stats = executor.stats()
+    assert stats["retries"] == 2 and stats["rate_limited"] == 2 and stats["circuit"] == "closed"
+
+
+def test_retry_after_header_is_honored():
+    executor, _, sleeps = make_executor()
+    provider = FakeProvider(FakeAPIError(429, {"retry-after": "7"}), FakeAPIError(503, {"retry-after-ms": "250"}))
+
+    assert executor.execute(provider) == "ok"
+    assert sleeps == [7.0, 0.25]
+
+
+def test_non_retryable_error_is_raised_immediately():
+    executor, _, sleeps = make_executor()
+    provider = FakeProvider(FakeAPIError(400))
+
+    with pytest.raises(FakeAPIError):
+        executor.execute(provider)
+    assert provider.calls == 1 and sleeps == []
+
+
+def test_breaker_opens_and_recovers():
+    executor, clock, _ = make_executor(threshold=2, max_retries=0)
+
+    for _ in range(2):
+        with pytest.raises(FakeAPIError):
+            executor.execute(FakeProvider(FakeAPIError(429)))
+    assert executor.stats()["circuit"] == "open"
+
+    provider = FakeProvider()
+    with pytest.raises(CircuitOpenError):
+        executor.execute(provider)
+    assert provider.calls == 0
+
+    clock.now += 31
+    assert executor.stats()["circuit"] == "half-open"
+    assert executor.execute(provider) == "ok"
+    assert executor.stats()["circuit"] == "closed"
+
+
+def test_failed_trial_reopens_breaker():
+    executor, clock, _ = make_executor(threshold=1, max_retries=0)
+    with pytest.raises(FakeAPIError):
+        executor.execute(FakeProvider(FakeAPIError(429)))
+
+    clock.now += 31
+    with pytest.raises(FakeAPIError):
+        executor.execute(FakeProvider(FakeAPIError(500)))
+    assert executor.stats()["circuit"] == "open"
+
+
+def test_non_retryable_trial_does_not_wedge_breaker():
+    executor, clock, _ = make_executor(threshold=1, max_retries=0)
+    with pytest.raises(FakeAPIError):
+        executor.execute(FakeProvider(FakeAPIError(429)))
+
+    clock.now += 31
+    with pytest.raises(FakeAPIError):
+        executor.execute(FakeProvider(FakeAPIError(400)))
+    assert executor.execute(FakeProvider()) == "ok"
+
+
+def test_abandoned_stream_trial_is_released():
+    executor, clock, _ = make_executor(threshold=1, max_retries=0)
+    with pytest.raises(FakeAPIError):
+        executor.execute(FakeProvider(FakeAPIError(429)))
+
+    clock.now += 31
+    stream = executor.stream(FakeStreamingLLM(["a", "b", "c"]), "prompt")
+    assert next(stream) == "a"
+    stream.close()  # client disconnected
+
+    assert executor.execute(FakeProvider()) == "ok"
+    assert list(executor.stream(FakeStreamingLLM(["x", "y"]), "prompt")) == ["x", "y"]
+
+
+def test_budget_waits_use_injected_sleep():
+    sleeps = []
+    executor = LLMExecutor(
+        rpm=60, tpm=1_000_000, max_retries=0, backoff_base=0.5, backoff_max=30,
+        breaker=CircuitBreaker(5, 30), sleep=sleeps.append,
+    )
+    for _ in range(61):
+        executor.execute(FakeProvider())
+    # The 61st request overdraws a 60/minute bucket by one: about a second of wait
+    assert len(sleeps) == 1 and 0.9 < sleeps[0] <= 1.0
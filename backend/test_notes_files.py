@@ -0,0 +1,23 @@
+import os
+
+
+def test_note_file_serves_recorded_uploads_only(backend_app):
+    folder = backend_app.app.config["UPLOAD_FOLDER"]
+    with open(os.path.join(folder, "notes.txt"), "w") as f:
+        f.write("Some notes")
+    backend_app.upload_catalog.record("notes.txt", 10, "hash")
+    with open(os.path.join(folder, "stray.txt"), "w") as f:
+        f.write("Not uploaded")
+    http = backend_app.app.test_client()
+
+    response = http.get("/api/notes/file/notes.txt")
+    assert response.status_code == 200 and response.get_data(as_text=True) == "Some notes"
+    assert http.get("/api/notes/file/stray.txt").status_code == 404
+
+
+def test_note_file_does_not_expose_cache(backend_app):
+    http = backend_app.app.test_client()
+    assert os.path.isfile(os.path.join(backend_app.CACHE_FOLDER, "catalog.sqlite3"))
+
+    for path in ["x/../.cache/catalog.sqlite3", "notes.txt/../.cache/catalog.sqlite3", ".cache/catalog.sqlite3"]:
+        assert http.get(f"/api/notes/file/{path}").status_code == 404
@@ -0,0 +1,21 @@
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the parser service carries a copy of, since its image is built from parser-parent only
+SHARED_MODULES = [
+    ("agents/csv_rows.py", "parser-parent/parser/services/csv_rows.py"),
+    ("agents/embedding_cache.py", "parser-parent/parser/services/embedding_cache.py"),
+    ("agents/http_pool.py", "parser-parent/parser/services/http_pool.py"),
+]
+
+
+@pytest.mark.parametrize("backend_path, parser_path", SHARED_MODULES)
+def test_parser_copy_matches_backend(backend_path, parser_path):
+    with open(os.path.join(ROOT, backend_path), encoding="utf-8") as f:
+        backend = f.read()
+    with open(os.path.join(ROOT, parser_path), encoding="utf-8") as f:
+        parser = f.read()
+    assert parser == backend, f"{parser_path} drifted from {backend_path}, copy it over again"
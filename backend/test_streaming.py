@@ -0,0 +1,121 @@
+import json
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from agents.student import StudentAgent
+
+QUESTION_TOKENS = ["What ", "is ", "photosynthesis", "?"]
+EVALUATION_TOKENS = ['{"grade": "A", ', '"comments": "Good", ', '"details": []}']
+
+
+class FakeChunk:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeStreamingLLM:
+    """Local stand-in for a streaming chat model: a fixed token list per kind of prompt."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def _tokens(self, prompt):
+        return EVALUATION_TOKENS if "transcript" in prompt else QUESTION_TOKENS
+
+    def stream(self, prompt):
+        self.prompts.append(prompt)
+        for token in self._tokens(prompt):
+            yield FakeChunk(token)
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        return FakeChunk("".join(self._tokens(prompt)))
+
+
+class FakeDoc:
+    page_content = "Plants turn light into chemical energy."
+
+
+class FakeVectorstore:
+    def as_retriever(self, search_kwargs=None):
+        return self
+
+    def invoke(self, query):
+        return [FakeDoc()]
+
+
+def make_agent():
+    llm = FakeStreamingLLM()
+    agent = StudentAgent(evaluator_llm=llm, topic_generator_llm=llm)
+    agent.vectorstore = FakeVectorstore()
+    agent.current_topic = "Photosynthesis"
+    return agent, llm
+
+
+def test_chat_stream_yields_tokens_then_done():
+    agent, _ = make_agent()
+
+    events = list(agent.chat_stream())
+
+    assert [payload for event, payload in events if event == "token"] == QUESTION_TOKENS
+    event, payload = events[-1]
+    assert event == "done"
+    assert payload["finished"] is False
+    assert payload["question"] == "What is photosynthesis?"
+    assert agent.history == [{"role": "assistant", "content": "What is photosynthesis?"}]
+
+
+def test_chat_stream_records_answer_before_next_question():
+    agent, _ = make_agent()
+    list(agent.chat_stream())
+
+    events = list(agent.chat_stream("Light becomes sugar."))
+
+    assert events[-1][0] == "done"
+    assert [msg["role"] for msg in agent.history] == ["assistant", "user", "assistant"]
+    assert agent.questions_asked == 1
+
+
+def test_evaluate_stream_parses_streamed_json():
+    agent, _ = make_agent()
+    agent.history = [{"role": "assistant", "content": "Q"}, {"role": "user", "content": "A"}]
+
+    events = list(agent.evaluate_stream())
+
+    assert [payload for event, payload in events if event == "token"] == EVALUATION_TOKENS
+    assert events[-1] == ("done", {"grade": "A", "comments": "Good", "details": []})
+
+
+def parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_endpoints(backend_app):
+    agent, _ = make_agent()
+    backend_app.save_agent("stream-test", agent)
+    backend_app.active_agents.put("stream-test", agent)
+    http = backend_app.app.test_client()
+
+    response = http.post("/api/chat/stream", json={"session_id": "stream-test"})
+    assert response.mimetype == "text/event-stream"
+    events = parse_sse(response.get_data(as_text=True))
+    assert [payload for event, payload in events if event == "token"] == QUESTION_TOKENS
+    assert events[-1][0] == "done" and events[-1][1]["question"] == "What is photosynthesis?"
+
+    response = http.post("/api/evaluate/stream", json={"session_id": "stream-test"})
+    events = parse_sse(response.get_data(as_text=True))
+    assert events[-1] == ("done", {"grade": "A", "comments": "Good", "details": []})
+
+    response = http.post("/api/chat/stream", json={"session_id": "missing"})
+    assert response.status_code == 404
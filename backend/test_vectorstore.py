@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("langchain_community")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from agents.vectorstore import compose_vectorstore
+
+
+def make_shard(texts):
+    return FAISS.from_texts(texts, DeterministicFakeEmbedding(size=8))
+
+
+def test_compose_copies_shards():
+    first = make_shard(["alpha", "beta"])
+    second = make_shard(["gamma"])
+
+    for _ in range(2):
+        merged = compose_vectorstore([first, second])
+        assert merged.index.ntotal == 3
+        assert merged.similarity_search("gamma", k=1)[0].page_content == "gamma"
+
+    # The shards are shared with the cache and other sessions
+    assert first.index.ntotal == 2 and second.index.ntotal == 1
+    assert first.similarity_search("beta", k=1)[0].page_content == "beta"
+    assert second.similarity_search("gamma", k=1)[0].page_content == "gamma"
+
+
+def test_compose_single_shard_is_reused():
+    shard = make_shard(["alpha"])
+    assert compose_vectorstore([None, shard]) is shard
@@ -40,14 +40,23 @@ const NotesViewer: React.FC = () => {
   useEffect(() => {
     const fetchFileList = async () => {
       try {
-        const response = await fetch('http://localhost:5000/api/notes/list');
-        if (!response.ok) throw new Error('Failed to fetch file list');
-        const data = await response.json();
-        setFiles(data.files);
+        // Follow next_cursor until the catalog has been read to the end
+        const allFiles: NoteFile[] = [];
+        let cursor: string | null = null;
+        do {
+          const params = new URLSearchParams({ limit: '500' });
+          if (cursor) params.set('cursor', cursor);
+          const response = await fetch(`http://localhost:5000/api/notes/list?${params}`);
+          if (!response.ok) throw new Error('Failed to fetch file list');
+          const data = await response.json();
+          allFiles.push(...data.files);
+          cursor = data.next_cursor;
+        } while (cursor);
+        setFiles(allFiles);
 
         // If no file is selected but files exist, select the first one
-        if (!selectedFilename && data.files.length > 0) {
-          setSelectedFilename(data.files[0].filename);
+        if (!selectedFilename && allFiles.length > 0) {
+          setSelectedFilename(allFiles[0].filename);
         }
       } catch (err) {
         console.error('Failed to fetch files', err);
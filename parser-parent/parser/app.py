@@ -7,12 +7,15 @@ import os
 from routes.ingestion import ingestion_bp
 from routes.retrieval import retrieval_bp
 from routes.teaching import teaching_bp
+from services import client_registry, embedding_cache
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     CORS(app)
     db.init_app(app)
+    # EMBEDDING_CACHE_PATH (shared with the backend) takes precedence over this default
+    embedding_cache.configure_embedding_cache(os.path.join(app.config['UPLOAD_FOLDER'], '.cache', 'embeddings.sqlite3'))
     app.register_blueprint(ingestion_bp)
     app.register_blueprint(retrieval_bp)
     app.register_blueprint(teaching_bp)
@@ -22,6 +25,13 @@ def create_app(config_class=Config):
             'status': 'healthy',
             'service': 'Upside Learning API'
         }), 200
+    @app.route('/metrics/clients', methods=['GET'])
+    def client_metrics():
+        return jsonify(client_registry.stats()), 200
+    @app.route('/metrics/embedding-cache', methods=['GET'])
+    def embedding_cache_metrics():
+        cache = embedding_cache.embedding_cache
+        return jsonify(cache.stats() if cache else None), 200
     @app.route('/', methods=['GET'])
     def root():
         return jsonify({
@@ -0,0 +1,21 @@
+"""Process-wide LLM and embedding clients sharing one pooled HTTP transport"""
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from services.embedding_cache import CachedEmbeddings
+from services.http_pool import get_or_create, stats
+
+
+def get_chat_model(model: str, temperature: float, purpose: str = "default") -> ChatOpenAI:
+    """Shared chat model for (model, temperature, purpose)."""
+    return get_or_create(
+        ("chat", model, temperature, purpose),
+        lambda http_client: ChatOpenAI(model=model, temperature=temperature, http_client=http_client),
+    )
+
+
+def get_embeddings(model: str) -> CachedEmbeddings:
+    """Shared embeddings for model, answered from the persistent embedding cache when it is configured."""
+    return get_or_create(
+        ("embeddings", model),
+        lambda http_client: CachedEmbeddings(OpenAIEmbeddings(model=model, http_client=http_client), model),
+    )
@@ -0,0 +1,9 @@
+"""Streaming CSV loader that packs whole rows into chunk-sized documents"""
+from langchain_core.documents import Document
+from services.csv_rows import iter_packed_rows
+from typing import Iterator
+
+
+def iter_csv_documents(file_path: str, chunk_size: int = 750) -> Iterator[Document]:
+    for text, first_row, last_row in iter_packed_rows(file_path, chunk_size):
+        yield Document(page_content=text, metadata={"source": file_path, "rows": f"{first_row}-{last_row}"})
@@ -0,0 +1,48 @@
+"""
+Packs CSV rows into header-prefixed text chunks.
+
+Shared with parser-parent/parser/services/csv_rows.py: the parser image is
+built from parser-parent only, so it carries a copy. Keep both files identical
+(backend/test_shared_modules.py checks it).
+"""
+import csv
+import io
+
+
+def csv_line(row: list) -> str:
+    """One record as CSV text. Cells with newlines stay quoted, so a record is never read as two."""
+    buffer = io.StringIO()
+    # The default terminator is what makes the writer quote embedded newlines; we only drop it afterwards
+    csv.writer(buffer).writerow(row)
+    return buffer.getvalue()[:-2]
+
+
+def iter_packed_rows(path: str, chunk_size: int):
+    """
+    Read a CSV one row at a time and yield (text, first_row, last_row) chunks
+    of whole rows, each starting with the header line and at most chunk_size
+    characters. Memory stays at one chunk whatever the file size; a row longer
+    than chunk_size becomes a chunk of its own. Row numbers are 1-based and
+    exclude the header. Raises UnicodeDecodeError for non UTF-8 files.
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        header_line = csv_line(header)
+        lines, size, first_row, last_row = [], len(header_line), 0, 0
+        for number, row in enumerate(reader, start=1):
+            if not any(cell.strip() for cell in row):
+                continue
+            line = csv_line(row)
+            if lines and size + 1 + len(line) > chunk_size:
+                yield "\n".join([header_line] + lines), first_row, last_row
+                lines, size = [], len(header_line)
+            if not lines:
+                first_row = number
+            lines.append(line)
+            size += 1 + len(line)
+            last_row = number
+        if lines:
+            yield "\n".join([header_line] + lines), first_row, last_row
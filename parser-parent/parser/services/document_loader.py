@@ -3,11 +3,11 @@ from langchain_community.document_loaders import (
     UnstructuredPDFLoader,
     UnstructuredWordDocumentLoader,
     TextLoader,
-    CSVLoader,
     UnstructuredImageLoader
 )
 from langchain_core.documents import Document
-from typing import List
+from services.csv_loader import iter_csv_documents
+from typing import Iterable, List
 import os
 
 class DocumentLoaderService:
@@ -25,7 +25,7 @@ class DocumentLoaderService:
                 return TextLoader(file_path, encoding='utf-8').load()
             
             elif file_path.endswith(".csv"):
-                return CSVLoader(file_path).load()
+                return list(iter_csv_documents(file_path))
             
             elif file_path.endswith((".png", ".jpg", ".jpeg")):
                 return UnstructuredImageLoader(file_path).load()
@@ -36,6 +36,13 @@ class DocumentLoaderService:
         except Exception as e:
             raise Exception(f"Error loading file {file_path}: {str(e)}")
     
+    @staticmethod
+    def iter_file(file_path: str, chunk_size: int = 750) -> Iterable[Document]:
+        """Like load_file, but CSVs are streamed as packed row chunks instead of loaded whole."""
+        if file_path.endswith(".csv"):
+            return iter_csv_documents(file_path, chunk_size)
+        return DocumentLoaderService.load_file(file_path)
+    
     @staticmethod
     def add_file_metadata(documents: List[Document], file_path: str, file_id: str, user_id: str) -> List[Document]:
         file_ext = os.path.splitext(file_path)[1]
@@ -1,5 +1,6 @@
 """Document processing service that orchestrates the ingestion pipeline"""
 from typing import List
+from itertools import islice
 import uuid
 from datetime import datetime
 from models import KnowledgeChunk, UploadedFile, db
@@ -8,8 +9,12 @@ from services.chunking_service import ChunkingService
 from services.metadata_service import MetadataExtractionService
 from services.embedding_service import EmbeddingService
 
+# Documents split, embedded and written per step, bounds memory for large files
+BATCH_DOCUMENTS = 64
+
 class DocumentProcessor:
     def __init__(self, chunk_size: int = 750, chunk_overlap: int = 150):
+        self.chunk_size = chunk_size
         self.loader = DocumentLoaderService()
         self.chunker = ChunkingService(chunk_size, chunk_overlap)
         self.metadata_extractor = MetadataExtractionService()
@@ -22,31 +27,40 @@ class DocumentProcessor:
                 uploaded_file.processing_status = 'processing'
                 db.session.commit()
             
-            documents = self.loader.load_file(file_path)
-            documents = self.loader.add_file_metadata(documents, file_path, file_id, user_id)
-            
-            chunks = self.chunker.split_documents(documents)
+            documents = iter(self.loader.iter_file(file_path, self.chunk_size))
+            chunks_created = 0
             
-            chunk_records = []
-            for chunk in chunks:
-                metadata = self.metadata_extractor.extract_metadata(chunk)
+            while True:
+                batch = list(islice(documents, BATCH_DOCUMENTS))
+                if not batch:
+                    break
+                batch = self.loader.add_file_metadata(batch, file_path, file_id, user_id)
+                chunks = self.chunker.split_documents(batch)
+                if not chunks:
+                    continue
                 
-                embedding = self.embedding_service.embed_text(chunk.page_content)
+                # One embeddings request per batch instead of one per chunk
+                embeddings = self.embedding_service.embed_texts([chunk.page_content for chunk in chunks])
                 
-                chunk_record = KnowledgeChunk(
-                    id=uuid.uuid4(),
-                    user_id=user_id,
-                    file_id=file_id,
-                    content_blob=chunk.page_content,
-                    embedding=embedding,
-                    topic=metadata.topic,
-                    keywords=metadata.keywords,
-                    difficulty_level=metadata.difficulty_level,
-                    summary=metadata.summary
-                )
-                chunk_records.append(chunk_record)
-            
-            db.session.bulk_save_objects(chunk_records)
+                chunk_records = []
+                for chunk, embedding in zip(chunks, embeddings):
+                    metadata = self.metadata_extractor.extract_metadata(chunk)
+                    
+                    chunk_record = KnowledgeChunk(
+                        id=uuid.uuid4(),
+                        user_id=user_id,
+                        file_id=file_id,
+                        content_blob=chunk.page_content,
+                        embedding=embedding,
+                        topic=metadata.topic,
+                        keywords=metadata.keywords,
+                        difficulty_level=metadata.difficulty_level,
+                        summary=metadata.summary
+                    )
+                    chunk_records.append(chunk_record)
+                
+                db.session.bulk_save_objects(chunk_records)
+                chunks_created += len(chunk_records)
             
             if uploaded_file:
                 uploaded_file.processing_status = 'completed'
@@ -56,11 +70,13 @@ class DocumentProcessor:
             
             return {
                 'success': True,
-                'chunks_created': len(chunk_records),
+                'chunks_created': chunks_created,
                 'file_id': file_id
             }
             
         except Exception as e:
+            # Drop chunks of earlier batches, a failed file should not be half ingested
+            db.session.rollback()
             if uploaded_file:
                 uploaded_file.processing_status = 'failed'
                 uploaded_file.error_message = str(e)
@@ -0,0 +1,233 @@
+"""
+Persistent embedding cache keyed by (model, dimensions, sha256 of the text).
+
+Shared with parser-parent/parser/services/embedding_cache.py: the parser image
+is built from parser-parent only, so it carries a copy. Keep both files
+identical (backend/test_shared_modules.py checks it); they also share the
+SQLite schema, so EMBEDDING_CACHE_PATH can point both services at one file.
+"""
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+import hashlib
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Same variable (and schema) in the backend and the parser service, point both at one file to share vectors
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH")
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# float16 halves the size, retrieval quality is unaffected in practice
+EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float32")
+# Free-text queries are rarely repeated, they are only kept in a small in-memory LRU
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "256"))
+
+# SQLite caps the number of bound parameters per statement
+_LOOKUP_BATCH = 500
+
+# Disabled until configure_embedding_cache is called
+embedding_cache = None
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def encode_vector(vector, dtype: str) -> bytes:
+    if dtype == "float16":
+        return struct.pack(f"<{len(vector)}e", *vector)
+    return array("f", vector).tobytes()
+
+
+def decode_vector(blob: bytes, dtype: str) -> list[float]:
+    if dtype == "float16":
+        return list(struct.unpack(f"<{len(blob) // 2}e", blob))
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class EmbeddingCache:
+    """
+    SQLite store of embedding vectors keyed by (model, dimensions, sha256 of
+    the text). Vectors are stored as float32 or float16 blobs; once the total
+    goes over max_bytes the least recently used entries are deleted. Safe to
+    share between processes (WAL).
+    """
+
+    def __init__(self, path: str, max_bytes: int, dtype: str = "float32"):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dtype = dtype
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL, dimensions INTEGER NOT NULL, text_sha256 TEXT NOT NULL,"
+                " dtype TEXT NOT NULL, vector BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL,"
+                " PRIMARY KEY (model, dimensions, text_sha256))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, model: str, dimensions: int, digests: list[str]) -> dict:
+        """Cached vectors for the given text hashes, as digest -> vector (misses are absent)."""
+        found = {}
+        now = time.time()
+        unique = list(dict.fromkeys(digests))
+        with self._connect() as conn:
+            for i in range(0, len(unique), _LOOKUP_BATCH):
+                batch = unique[i:i + _LOOKUP_BATCH]
+                placeholders = ", ".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT text_sha256, dtype, vector FROM embeddings"
+                    f" WHERE model = ? AND dimensions = ? AND text_sha256 IN ({placeholders})",
+                    [model, dimensions, *batch],
+                ).fetchall()
+                for digest, dtype, blob in rows:
+                    found[digest] = decode_vector(blob, dtype)
+                if rows:
+                    conn.execute(
+                        f"UPDATE embeddings SET last_used = ?"
+                        f" WHERE model = ? AND dimensions = ? AND text_sha256 IN ({', '.join('?' * len(rows))})",
+                        [now, model, dimensions, *(row[0] for row in rows)],
+                    )
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, model: str, dimensions: int, vectors: dict):
+        """Store digest -> vector entries, then evict down to max_bytes."""
+        if not vectors:
+            return
+        now = time.time()
+        rows = []
+        for digest, vector in vectors.items():
+            blob = encode_vector(vector, self.dtype)
+            rows.append((model, dimensions, digest, self.dtype, blob, len(blob), now))
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% so we do not evict again on the very next insert
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        evicted = []
+        for model, dimensions, digest, size in conn.execute(
+            "SELECT model, dimensions, text_sha256, size FROM embeddings ORDER BY last_used"
+        ):
+            evicted.append((model, dimensions, digest))
+            freed += size
+            if freed >= target:
+                break
+        conn.executemany("DELETE FROM embeddings WHERE model = ? AND dimensions = ? AND text_sha256 = ?", evicted)
+        with self._lock:
+            self.evictions += len(evicted)
+        logger.info(f"Embedding cache evicted {len(evicted)} vectors ({freed} bytes)")
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings").fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "dtype": self.dtype,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+            }
+
+
+def configure_embedding_cache(default_path: str = None):
+    """Enable the cache at EMBEDDING_CACHE_PATH, or default_path when the variable is unset."""
+    global embedding_cache
+    path = EMBEDDING_CACHE_PATH or default_path
+    if path:
+        embedding_cache = EmbeddingCache(path, EMBEDDING_CACHE_MAX_BYTES, EMBEDDING_CACHE_DTYPE)
+    return embedding_cache
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that answers documents from the embedding cache and only
+    sends misses to the wrapped model. Passes straight through while the cache
+    is not configured. Queries never reach the persistent cache, where they
+    would evict document vectors, and are kept in a small in-memory LRU instead.
+    """
+
+    def __init__(self, inner, model: str):
+        self.inner = inner
+        self.model = model
+        self.dimensions = getattr(inner, "dimensions", None) or 0
+        self._queries = OrderedDict()  # text sha256 -> vector
+        self._queries_lock = threading.Lock()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        cache = embedding_cache
+        if cache is None or not texts:
+            return self.inner.embed_documents(texts)
+
+        digests = [text_sha256(text) for text in texts]
+        try:
+            vectors = cache.get_many(self.model, self.dimensions, digests)
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            return self.inner.embed_documents(texts)
+
+        missing = {}
+        for digest, text in zip(digests, texts):
+            if digest not in vectors:
+                missing.setdefault(digest, text)
+        if missing:
+            computed = dict(zip(missing, self.inner.embed_documents(list(missing.values()))))
+            vectors.update(computed)
+            try:
+                cache.put_many(self.model, self.dimensions, computed)
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+        return [vectors[digest] for digest in digests]
+
+    def embed_query(self, text: str) -> list[float]:
+        digest = text_sha256(text)
+        with self._queries_lock:
+            vector = self._queries.get(digest)
+            if vector is not None:
+                self._queries.move_to_end(digest)
+                return vector
+        vector = self.inner.embed_query(text)
+        with self._queries_lock:
+            self._queries[digest] = vector
+            while len(self._queries) > QUERY_CACHE_SIZE:
+                self._queries.popitem(last=False)
+        return vector
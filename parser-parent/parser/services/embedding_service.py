@@ -1,5 +1,5 @@
 """Embedding service for generating vector embeddings"""
-from langchain_openai import OpenAIEmbeddings
+from services.client_registry import get_embeddings
 from typing import List
 import os
 
@@ -10,7 +10,7 @@ class EmbeddingService:
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
         
-        self.embeddings = OpenAIEmbeddings(model=model)
+        self.embeddings = get_embeddings(model)
     
     def embed_text(self, text: str) -> List[float]:
         return self.embeddings.embed_query(text)
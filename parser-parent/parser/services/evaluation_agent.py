@@ -1,5 +1,5 @@
 """Master Evaluation Agent for grading user responses"""
-from langchain_openai import ChatOpenAI
+from services.client_registry import get_chat_model
 from langchain_core.documents import Document
 from typing import List, Dict
 from schemas import EvaluationResult
@@ -24,7 +24,7 @@ Be constructive and encouraging while being honest about gaps in understanding."
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
         
-        self.llm = ChatOpenAI(model=model_name, temperature=temperature)
+        self.llm = get_chat_model(model_name, temperature, "evaluation")
         self.evaluation_chain = self.llm.with_structured_output(EvaluationResult)
     
     def evaluate_session(
@@ -0,0 +1,104 @@
+"""
+Process-wide pooled HTTP transport for OpenAI clients, with connection reuse metrics.
+
+Shared with parser-parent/parser/services/http_pool.py: the parser image is
+built from parser-parent only, so it carries a copy. Keep both files identical
+(backend/test_shared_modules.py checks it).
+"""
+import os
+import threading
+import time
+
+import httpx
+
+# One connection pool for every OpenAI call in the process
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "120"))
+
+
+class PoolMetrics:
+    """Counts requests vs. new connections and the time spent opening them (TCP + TLS)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.connect_seconds = 0.0
+
+    def trace_request(self, request):
+        with self._lock:
+            self.requests += 1
+        started = {}
+
+        # httpcore reports connection setup through the "trace" request extension
+        def trace(event_name, info):
+            if event_name in ("connection.connect_tcp.started", "connection.start_tls.started"):
+                started[event_name] = time.perf_counter()
+            elif event_name == "connection.connect_tcp.complete":
+                self._connected(time.perf_counter() - started.pop("connection.connect_tcp.started", time.perf_counter()), new=True)
+            elif event_name == "connection.start_tls.complete":
+                self._connected(time.perf_counter() - started.pop("connection.start_tls.started", time.perf_counter()), new=False)
+
+        request.extensions["trace"] = trace
+
+    def _connected(self, seconds: float, new: bool):
+        with self._lock:
+            if new:
+                self.connections += 1
+            self.connect_seconds += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            reused = max(self.requests - self.connections, 0)
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections,
+                "requests_on_reused_connections": reused,
+                "reuse_ratio": round(reused / self.requests, 3) if self.requests else None,
+                "connect_seconds_total": round(self.connect_seconds, 3),
+                "connect_seconds_avg": round(self.connect_seconds / self.connections, 4) if self.connections else None,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+_http_client = None
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """Process-wide pooled HTTP transport, keeps TCP/TLS sessions alive between calls."""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(120.0, connect=10.0),
+                event_hooks={"request": [pool_metrics.trace_request]},
+            )
+        return _http_client
+
+
+def get_or_create(key, factory):
+    """Client for key, created once by factory(http_client) on the shared pool."""
+    client = _clients.get(key)
+    if client is None:
+        http_client = get_http_client()
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = factory(http_client)
+                _clients[key] = client
+    return client
+
+
+def stats() -> dict:
+    with _lock:
+        clients = ["/".join(str(part) for part in key) for key in _clients]
+    return {"clients": clients, "pool": pool_metrics.stats()}
@@ -1,5 +1,5 @@
 """Metadata extraction service using LLM structured output"""
-from langchain_openai import ChatOpenAI
+from services.client_registry import get_chat_model
 from langchain_core.documents import Document
 from typing import List
 from schemas import TopicMetadata
@@ -11,7 +11,7 @@ class MetadataExtractionService:
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
         
-        self.llm = ChatOpenAI(model=model_name, temperature=temperature)
+        self.llm = get_chat_model(model_name, temperature, "metadata")
         self.metadata_chain = self.llm.with_structured_output(TopicMetadata)
     
     def extract_metadata(self, chunk: Document) -> TopicMetadata:
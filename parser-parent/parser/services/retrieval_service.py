@@ -1,5 +1,5 @@
 """Retrieval service with keyword expansion"""
-from langchain_openai import ChatOpenAI
+from services.client_registry import get_chat_model
 from langchain_core.documents import Document
 from typing import List
 from sqlalchemy import text
@@ -14,7 +14,7 @@ class RetrievalService:
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
         
-        self.llm = ChatOpenAI(model=model_name, temperature=temperature)
+        self.llm = get_chat_model(model_name, temperature, "keyword_expansion")
         self.expansion_chain = self.llm.with_structured_output(KeywordExpansion)
         self.embedding_service = EmbeddingService()
     
@@ -1,5 +1,5 @@
 """Stupid Student Agent for asking questions"""
-from langchain_openai import ChatOpenAI
+from services.client_registry import get_chat_model
 from langchain_core.documents import Document
 from typing import List, Optional
 from schemas import StudentQuestion
@@ -24,7 +24,7 @@ Rules:
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
         
-        self.llm = ChatOpenAI(model=model_name, temperature=temperature)
+        self.llm = get_chat_model(model_name, temperature, "student")
         self.question_chain = self.llm.with_structured_output(StudentQuestion)
         self.max_questions = max_questions
     